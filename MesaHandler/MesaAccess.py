@@ -1,15 +1,84 @@
-from MesaHandler.MesaFileHandler import MesaFileAccess
+from MesaHandler.MesaFileHandler import (
+    MesaFileAccess, MesaEnvironmentHandler
+)
 from MesaHandler.support import *
 
+import os
+import threading
+import numpy as np
 from collections import OrderedDict
 
 
 class MesaAccess:
-    def __init__(self):
-        self.mesaFileAccess = MesaFileAccess()
+    cacheSize = 64
+    _cache = OrderedDict()
+    _envObjects = {}
+    _cacheLock = threading.Lock()
+
+    def __init__(self, directory=".", envObject=None):
+        self.mesaFileAccess = MesaFileAccess(directory, envObject)
 
         self._fullDict = self.stripFullDict()
 
+    @classmethod
+    def cached(cls, directory="."):
+        """ Returns the accessor of the inlist chain of a directory,
+        reusing the one returned before if no file of the chain changed.
+
+        Staleness is checked with a stat of every file in the chain, so
+        reading parameters in a loop does not read or parse any file.
+        Edits through the returned accessor keep it up to date. The
+        accessors are kept in an LRU cache of cacheSize entries, keyed by
+        the resolved path of the root inlist, and the MESA defaults are
+        parsed once per MESA_DIR. Accessors are shared, so they should
+        not be edited from several threads at once.
+
+        Args:
+            directory (str): Directory containing the root inlist.
+
+        Returns:
+            MesaAccess: The accessor.
+        """
+        key = os.path.realpath(os.path.join(directory, "inlist"))
+        with cls._cacheLock:
+            access = cls._cache.get(key)
+            if access is not None:
+                cls._cache.move_to_end(key)
+        if access is not None and not access.mesaFileAccess.isStale():
+            return access
+
+        access = cls(directory, cls.environment())
+        with cls._cacheLock:
+            cls._cache[key] = access
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > cls.cacheSize:
+                cls._cache.popitem(last=False)
+        return access
+
+    @classmethod
+    def environment(cls):
+        """ Returns the parsed defaults of the current MESA_DIR. """
+        mesaDir = os.environ.get(mesa_env)
+        with cls._cacheLock:
+            envObject = cls._envObjects.get(mesaDir)
+        if envObject is None:
+            envObject = MesaEnvironmentHandler()
+            with cls._cacheLock:
+                cls._envObjects[mesaDir] = envObject
+        return envObject
+
+    @classmethod
+    def invalidate(cls, directory=None):
+        """ Removes the accessor of a directory, or all accessors,
+        from the cache.
+        """
+        with cls._cacheLock:
+            if directory is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(os.path.realpath(
+                    os.path.join(directory, "inlist")), None)
+
     def stripToDict(self, section):
         retDict = OrderedDict()
         for file, parameterDict in self.mesaFileAccess.dataDict[section].items():
@@ -33,10 +102,19 @@ class MesaAccess:
         return self._fullDict.keys()
 
     def __getitem__(self, item):
+        if (item not in self._fullDict and
+                item in self.mesaFileAccess.envObject.arrayDict):
+            return MesaArray(self, item)
         return self._fullDict[item]
 
     def __setitem__(self, key, value):
-        if key in self._fullDict.keys():
+        if isinstance(value, (np.ndarray, list, tuple)):
+            span = self.mesaFileAccess.arraySpan(key, None)
+            if span is None:
+                MesaArray(self, key)[:] = value
+            else:
+                MesaArray(self, span[0])[span[1]:] = value
+        elif key in self._fullDict.keys():
             self.mesaFileAccess[key] = value
         else:
             self.mesaFileAccess.addValue(key, value)
@@ -45,3 +123,101 @@ class MesaAccess:
     def __delitem__(self, key):
         if key in self._fullDict.keys():
             self.mesaFileAccess.removeValue(key)
+
+
+class MesaArray:
+    """ View of an array parameter of the inlists.
+
+    Elements are indexed like in Fortran: indices start at the lower bound
+    of the array, usually 1, and slices include their upper bound. Unset
+    elements have their default value. Example:
+
+    ma = MesaAccess()
+    ma['x_ctrl'][1:3] = np.array([0.5, 0.5, 1.0])  # x_ctrl(1:3)
+    ma['x_ctrl'][2]  # 0.5
+
+    Attributes:
+        access (MesaAccess): The accessor of the inlists.
+        name (str): Name of the array.
+    """
+
+    def __init__(self, access, name):
+        self.access = access
+        self.name = name
+        envObject = access.mesaFileAccess.envObject
+        if name not in envObject.arrayDict:
+            raise KeyError("The array " + name + " is not available "
+                           "through Mesa.")
+        section, default, bounds = envObject.arrayDict[name]
+        self.default = envObject.dataDict[section][default]
+        self.lower, self.upper = bounds
+        self.integer = envObject.isInteger(name)
+        self.default = self.toElement(self.default)
+
+    def toElement(self, value):
+        """ Numbers are read as floats, the elements of
+        integer arrays are returned as ints.
+        """
+        if(self.integer and isinstance(value, float) and
+                value.is_integer()):
+            return int(value)
+        return value
+
+    def elements(self):
+        """ Returns the values of the assigned elements, keyed by index. """
+        elements = {}
+        for key, value in self.access.items():
+            span = self.access.mesaFileAccess.arraySpan(key, value)
+            if span is None or span[0] != self.name:
+                continue
+            if isinstance(value, np.ndarray):
+                elements.update(zip(range(span[1], span[2] + 1),
+                                    map(self.toElement, value.tolist())))
+            else:
+                elements[span[1]] = self.toElement(value)
+        return elements
+
+    def checkStep(self, index):
+        """ Fortran array sections in inlists have no stride. """
+        if index.step not in (None, 1):
+            raise ValueError("Slices of " + self.name + " cannot have "
+                             "a step, got " + str(index.step))
+
+    def __getitem__(self, index):
+        elements = self.elements()
+        if isinstance(index, slice):
+            self.checkStep(index)
+            first = self.lower if index.start is None else index.start
+            if index.stop is not None:
+                last = index.stop
+            elif self.upper is not None:
+                last = self.upper
+            else:
+                last = max(list(elements.keys()) + [first])
+            return np.array([elements.get(i, self.default)
+                             for i in range(first, last + 1)])
+        return elements.get(index, self.default)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self.checkStep(index)
+            first = self.lower if index.start is None else index.start
+            values = np.asarray(value)
+            if values.ndim == 0:
+                if index.stop is None:
+                    raise ValueError("Assigning a scalar to " + self.name +
+                                     " needs the last index of the slice")
+                values = np.full(index.stop - first + 1, value)
+            elif (index.stop is not None and
+                    len(values) != index.stop - first + 1):
+                raise ValueError("Cannot assign {} values to {}({}:{})"
+                                 .format(len(values), self.name, first,
+                                         index.stop))
+        else:
+            first, values = index, np.asarray([value])
+
+        self.access.mesaFileAccess.setArray(self.name, first, values)
+        self.access._fullDict = self.access.stripFullDict()
+
+    def __repr__(self):
+        return "MesaArray({}, {})".format(self.name, self.elements())
@@ -0,0 +1,201 @@
+# Collects the results of many MESA runs into one table
+import os
+import csv
+import json
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from MesaHandler.MesaFileHandler import MesaInlistResolver
+from MesaHandler.MesaLogReader import MesaLogReader
+from MesaHandler.support import *
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # parquet output is optional
+    pyarrow = None
+
+
+class MesaAggregator:
+    """ Collects the final state of many runs into one columnar table.
+
+    Every run directory is read in a worker process, which only reads the
+    header and last row of the history, the header of the terminal profile,
+    the run record written by MesaRunner and the resolved inlist chain.
+
+    Attributes:
+        history_columns (list): History columns taken from the last row.
+        parameters (list): Inlist parameters added to the table,
+                           all scalar parameters if None.
+        inlist (str): Root inlist of every run directory.
+        processes (int): Number of worker processes.
+    """
+
+    def __init__(self, history_columns=('model_number', 'star_age',
+                                        'star_mass', 'log_R', 'log_L',
+                                        'log_Teff'),
+                 parameters=None, inlist='inlist', processes=None):
+        """ __init__ method
+
+        Args:
+            history_columns (list): History columns taken from the last row.
+            parameters (list): Inlist parameters added to the table,
+                               all scalar parameters if None.
+            inlist (str): Root inlist of every run directory.
+            processes (int): Number of worker processes,
+                             defaults to the number of CPUs.
+        """
+        self.history_columns = list(history_columns)
+        self.parameters = None if parameters is None else list(parameters)
+        self.inlist = inlist
+        self.processes = processes or os.cpu_count()
+
+    def collect(self, directories):
+        """ Collects the results of the run directories.
+
+        Args:
+            directories (list): Run directories.
+
+        Returns:
+            OrderedDict: Arrays of the table columns, keyed by their names.
+        """
+        directories = list(directories)
+        chunksize = max(1, len(directories) // (4 * self.processes))
+        with ProcessPoolExecutor(self.processes) as pool:
+            rows = list(pool.map(
+                _collect_run, directories,
+                [self.inlist] * len(directories),
+                [self.history_columns] * len(directories),
+                [self.parameters] * len(directories),
+                chunksize=chunksize))
+
+        return self.to_columns(rows)
+
+    def aggregate(self, directories, file_name):
+        """ Collects the results of the run directories and writes them.
+
+        Args:
+            directories (list): Run directories.
+            file_name (str): Output file, see write.
+
+        Returns:
+            OrderedDict: Arrays of the table columns, keyed by their names.
+        """
+        table = self.collect(directories)
+        self.write(table, file_name)
+        return table
+
+    @staticmethod
+    def find_runs(root, inlist='inlist'):
+        """ Finds the run directories below root.
+
+        Args:
+            root (str): Directory to search.
+            inlist (str): Name of the root inlist of a run.
+
+        Returns:
+            list: Directories containing the root inlist.
+        """
+        runs = []
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if d not in ['LOGS', 'photos', 'png',
+                                                    'make', 'src']]
+            if inlist in files:
+                runs.append(directory)
+        return sorted(runs)
+
+    @staticmethod
+    def to_columns(rows):
+        """ Turns a list of rows into columns. Missing values are NaN,
+        or empty strings in text columns.
+        """
+        names = OrderedDict()
+        for row in rows:
+            names.update((name, None) for name in row.keys())
+
+        table = OrderedDict()
+        for name in names:
+            values = [row.get(name) for row in rows]
+            if any(isinstance(v, str) for v in values):
+                table[name] = np.array(['' if v is None else str(v)
+                                        for v in values])
+            else:
+                table[name] = np.array([np.nan if v is None else v
+                                        for v in values], dtype=float)
+        return table
+
+    @staticmethod
+    def write(table, file_name):
+        """ Writes a table as .npz, .csv or .parquet, depending on the
+        extension of the file name.
+        """
+        extension = os.path.splitext(file_name)[1]
+        if extension == '.npz':
+            np.savez_compressed(file_name, **table)
+        elif extension == '.csv':
+            with open(file_name, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(table.keys())
+                writer.writerows(zip(*[column.tolist()
+                                       for column in table.values()]))
+        elif extension == '.parquet':
+            if pyarrow is None:
+                raise ImportError("Writing parquet files requires pyarrow")
+            pyarrow.parquet.write_table(pyarrow.table(
+                OrderedDict((name, column)
+                            for name, column in table.items())), file_name)
+        else:
+            raise ValueError("Unknown output format " + extension +
+                             ", expected .npz, .csv or .parquet")
+
+
+def _collect_run(directory, inlist, history_columns, parameters):
+    """ Reads the results of a single run. """
+    row = OrderedDict([('directory', directory), ('status', 'ok')])
+
+    resolver = MesaInlistResolver(directory, strict=False)
+    try:
+        inlistParameters = resolver.resolveParameters(inlist)
+    except (OSError, ValueError) as e:
+        row['status'] = str(e)
+        return row
+
+    log_dir = inlistParameters.get('log_directory', 'LOGS')
+    history_name = inlistParameters.get('star_history_name', 'history.data')
+    last_row = None
+    try:
+        history = MesaLogReader(os.path.join(directory, log_dir,
+                                             history_name))
+        last_row = history.last_row()
+    except (OSError, IndexError) as e:
+        row['status'] = str(e)
+    if last_row is None:
+        last_row = {}
+        profile_name = inlistParameters.get(
+            'filename_for_profile_when_terminate', '')
+        if profile_name:
+            try:
+                last_row = MesaLogReader(
+                    os.path.join(directory, profile_name)).header
+            except (OSError, IndexError):
+                pass
+    for column in history_columns:
+        row[column] = last_row.get(column)
+
+    record = {}
+    record_file = os.path.join(directory, run_record_name)
+    if os.path.isfile(record_file):
+        with open(record_file) as f:
+            lines = [line for line in f if line.strip()]
+        if lines:
+            record = json.loads(lines[-1])
+    row['convergence'] = record.get('convergence')
+    row['run_time'] = record.get('run_time', last_row.get('elapsed_time'))
+
+    for name, value in inlistParameters.items():
+        if parameters is not None and name not in parameters:
+            continue
+        if isinstance(value, (bool, int, float, str)):
+            row[name] = value
+    return row
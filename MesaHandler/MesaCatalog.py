@@ -0,0 +1,278 @@
+# Catalogs the parameters and outcomes of many MESA runs in SQLite
+import os
+import json
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from MesaHandler.MesaAggregator import MesaAggregator, _collect_run
+from MesaHandler.MesaFileHandler import MesaInlistResolver
+from MesaHandler.support import *
+
+
+class MesaCatalog:
+    """ Index of the parameters and outcomes of the runs below a directory,
+    stored in a SQLite database.
+
+    Run directories are scanned in parallel worker processes, and every
+    inlist chain is resolved only once. A rescan only reads the runs whose
+    inlists, history or run record changed since the last scan, which
+    the workers check with a stat of every file. Runs that disappeared
+    are removed. The parameters are stored one row per parameter, with an
+    index on (name, value), so every parameter query is an index range
+    scan, however many runs there are. Example:
+
+    catalog = MesaCatalog('grid.sqlite')
+    catalog.scan('grid')
+    catalog.query({'mixing_length_alpha': 2.0, 'initial_mass': (1, 2)})
+
+    Attributes:
+        database (str): SQLite database file.
+        inlist (str): Root inlist of every run directory.
+        processes (int): Number of worker processes.
+    """
+
+    outcome_columns = ['status', 'model_number', 'star_age',
+                       'convergence', 'run_time']
+
+    def __init__(self, database='mesa_catalog.sqlite', inlist='inlist',
+                 processes=None):
+        """ __init__ method
+
+        Args:
+            database (str): SQLite database file, created if needed.
+            inlist (str): Root inlist of every run directory.
+            processes (int): Number of worker processes,
+                             defaults to the number of CPUs.
+        """
+        self.database = database
+        self.inlist = inlist
+        self.processes = processes or os.cpu_count()
+        self.connection = sqlite3.connect(database)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.create_tables()
+
+    def create_tables(self):
+        with self.connection:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    directory TEXT UNIQUE NOT NULL,
+                    files TEXT,
+                    status TEXT,
+                    model_number REAL,
+                    star_age REAL,
+                    convergence INTEGER,
+                    run_time REAL
+                );
+                CREATE TABLE IF NOT EXISTS parameters (
+                    run_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    number REAL,
+                    text TEXT
+                );
+                CREATE INDEX IF NOT EXISTS parameters_number
+                    ON parameters (name, number, run_id);
+                CREATE INDEX IF NOT EXISTS parameters_text
+                    ON parameters (name, text, run_id);
+                CREATE INDEX IF NOT EXISTS parameters_run
+                    ON parameters (run_id);
+            ''')
+
+    def scan(self, root):
+        """ Adds the runs below root to the catalog, or updates them.
+
+        Args:
+            root (str): Directory to search for runs.
+
+        Returns:
+            list: The directories that were read.
+        """
+        root = os.path.abspath(root)
+        directories = [os.path.abspath(d)
+                       for d in MesaAggregator.find_runs(root, self.inlist)]
+        known = OrderedDict(
+            (directory, (run_id, json.loads(files or '{}')))
+            for run_id, directory, files in self.connection.execute(
+                'SELECT id, directory, files FROM runs'))
+
+        chunksize = max(1, len(directories) // (16 * self.processes))
+        with ProcessPoolExecutor(self.processes) as pool:
+            results = pool.map(
+                _scan_run, directories, [self.inlist] * len(directories),
+                [known.get(d, (None, None))[1] for d in directories],
+                chunksize=chunksize)
+
+            scanned = []
+            with self.connection:
+                for directory, files, row, parameters in results:
+                    if files is None:  # unchanged
+                        continue
+                    self.store(known.get(directory, (None,))[0], directory,
+                               files, row, parameters)
+                    scanned.append(directory)
+
+                found = set(directories)
+                removed = [run_id for directory, (run_id, _) in known.items()
+                           if directory not in found and
+                           (directory + os.sep).startswith(root + os.sep)]
+                for run_id in removed:
+                    self.delete(run_id)
+        return scanned
+
+    def store(self, run_id, directory, files, row, parameters):
+        values = [json.dumps(files)] + [row.get(column)
+                                        for column in self.outcome_columns]
+        if run_id is None:
+            run_id = self.connection.execute(
+                'INSERT INTO runs (files, {}, directory) VALUES '
+                '(?, ?, ?, ?, ?, ?, ?)'.format(
+                    ', '.join(self.outcome_columns)),
+                values + [directory]).lastrowid
+        else:
+            self.connection.execute(
+                'UPDATE runs SET files = ?, {} WHERE id = ?'.format(
+                    ', '.join(c + ' = ?' for c in self.outcome_columns)),
+                values + [run_id])
+            self.connection.execute('DELETE FROM parameters WHERE run_id = ?',
+                                    (run_id,))
+        self.connection.executemany(
+            'INSERT INTO parameters (run_id, name, number, text) '
+            'VALUES (?, ?, ?, ?)',
+            [(run_id, name, number, text)
+             for name, number, text in parameters])
+
+    def delete(self, run_id):
+        self.connection.execute('DELETE FROM parameters WHERE run_id = ?',
+                                (run_id,))
+        self.connection.execute('DELETE FROM runs WHERE id = ?', (run_id,))
+
+    def query(self, conditions=None, **outcomes):
+        """ Finds the runs matching all conditions.
+
+        Args:
+            conditions (dict): Required parameter values, keyed by
+                               parameter name. A (low, high) tuple matches
+                               the values in this range, bounds included,
+                               and None for a bound leaves it open.
+            **outcomes: Required values of the outcome columns,
+                        e.g. convergence=True.
+
+        Returns:
+            list: OrderedDicts with the directory and outcome of every
+                  matching run, sorted by directory.
+        """
+        clauses = []
+        arguments = []
+        for name, value in (conditions or {}).items():
+            clause, args = self.condition(value)
+            clauses.append('id IN (SELECT run_id FROM parameters '
+                           'WHERE name = ? AND ' + clause + ')')
+            arguments.extend([name] + args)
+        for column, value in outcomes.items():
+            if column not in self.outcome_columns:
+                raise KeyError('Unknown outcome column ' + column)
+            clause, args = self.condition(value, column, column)
+            clauses.append(clause)
+            arguments.extend(args)
+
+        columns = ['directory'] + self.outcome_columns
+        sql = 'SELECT {} FROM runs'.format(', '.join(columns))
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY directory'
+        return [OrderedDict(zip(columns, row))
+                for row in self.connection.execute(sql, arguments)]
+
+    @staticmethod
+    def condition(value, number='number', text='text'):
+        """ Returns the SQL condition on a value and its arguments.
+
+        Args:
+            value: The value, a string, or a (low, high) range.
+            number (str): Column of numerical values.
+            text (str): Column of text values.
+        """
+        if isinstance(value, tuple):
+            if len(value) != 2:
+                raise ValueError('Expected a (low, high) range, got ' +
+                                 str(value))
+            clauses, args = [], []
+            if value[0] is not None:
+                clauses.append(number + ' >= ?')
+                args.append(value[0])
+            if value[1] is not None:
+                clauses.append(number + ' <= ?')
+                args.append(value[1])
+            return ' AND '.join(clauses) or number + ' IS NOT NULL', args
+        if isinstance(value, str):
+            return text + ' = ?', [value]
+        return number + ' = ?', [float(value)]
+
+    def parameters(self, directory):
+        """ Returns the parameters of a run in the catalog.
+
+        Args:
+            directory (str): Run directory.
+
+        Returns:
+            OrderedDict: The resolved scalar parameters of the run.
+        """
+        parameters = OrderedDict()
+        for name, number, text in self.connection.execute(
+                'SELECT name, number, text FROM parameters JOIN runs '
+                'ON runs.id = parameters.run_id WHERE directory = ? '
+                'ORDER BY parameters.rowid', (os.path.abspath(directory),)):
+            parameters[name] = text if text is not None else number
+        return parameters
+
+    def close(self):
+        self.connection.close()
+
+
+def _file_stamps(paths):
+    stamps = OrderedDict()
+    for path in paths:
+        try:
+            stamps[path] = list(MesaInlistResolver.getStamp(path))
+        except OSError:
+            stamps[path] = None
+    return stamps
+
+
+def _scan_run(directory, inlist, files):
+    """ Reads a run, unless none of its files changed since the last scan.
+
+    Returns:
+        tuple: The directory, the stamps of its files (None if unchanged),
+               the outcome of the run and (name, number, text)
+               of every parameter.
+    """
+    if files and _file_stamps(files.keys()) == files:
+        return directory, None, None, None
+
+    resolver = MesaInlistResolver(directory, strict=False)
+    try:
+        inlistParameters = resolver.resolveParameters(inlist)
+    except (OSError, ValueError):
+        inlistParameters = OrderedDict()
+    paths = list(resolver.files) + [
+        os.path.join(directory, run_record_name),
+        os.path.join(directory,
+                     inlistParameters.get('log_directory', 'LOGS'),
+                     inlistParameters.get('star_history_name',
+                                          'history.data'))]
+    paths += [resolver.getPath(filename) for _, filename in resolver.missing]
+    stamps = _file_stamps(paths)
+
+    row = _collect_run(directory, inlist, ['model_number', 'star_age'], None)
+    parameters = []
+    for name, value in row.items():
+        if name == 'directory' or name in MesaCatalog.outcome_columns:
+            continue
+        if isinstance(value, str):
+            parameters.append((name, None, value))
+        else:
+            parameters.append((name, float(value), None))
+    return directory, stamps, row, parameters
@@ -1,17 +1,114 @@
 import os
 import re
+import glob
+import numpy as np
 
 from MesaHandler.support import *
-from MesaHandler.MesaFileHandler.MesaFileInterface import IMesaInterface
+from MesaHandler.MesaFileHandler.MesaFileInterface import (
+    IMesaInterface, rx_read_parameter
+)
+
+rx_integerLiteral = re.compile(r"^(\d+\*)?[-+]?\d+$")
+rx_declaration = re.compile(r"^\s*(integer|real|double\s+precision)\b"
+                            r"[^:!'\n]*::([^!\n]*)",
+                            re.IGNORECASE | re.MULTILINE)
 
 
 class MesaEnvironmentHandler(IMesaInterface):
     def __init__(self):
         IMesaInterface.__init__(self)
         self.mesaDir, self.defaultsDir = self.readMesaDirs(mesa_env)
+        self.integerParameters = set()
         for section, file in defaultsFileDict.items():
             fileContent = self.readFile(self.defaultsDir + file)
             self.dataDict[section] = self.getParameters(fileContent)
+            for name, value in rx_read_parameter.findall(fileContent):
+                if all(rx_integerLiteral.match(token.strip())
+                       for token in value.split(",")):
+                    self.integerParameters.add(self.baseName(name))
+        declarations = self.readDeclarations()
+        if declarations:
+            self.integerParameters = set(name for name, integer
+                                         in declarations.items() if integer)
+        self.arrayDict = self.getArrays()
+
+    def readDeclarations(self):
+        """ Reads the Fortran declarations of the controls from the MESA
+        sources, where available. The defaults files write many reals
+        without a decimal point, e.g. initial_mass = 1, so the declarations
+        replace the types guessed from the defaults if there are any.
+
+        Returns:
+            dict: True for integer and False for real parameters,
+                  keyed by the lower case parameter name.
+        """
+        declarations = {}
+        for pattern in declaration_file_patterns:
+            for fileName in glob.glob(os.path.join(self.mesaDir, pattern)):
+                content = self.readFile(fileName)
+                content = re.sub(r"&[ \t]*(![^\n]*)?\n[ \t]*&?", "", content)
+                for kind, names in rx_declaration.findall(content):
+                    names = re.sub(r"\([^)]*\)", "", names)
+                    for name in names.split(","):
+                        name = name.split("=")[0].strip().lower()
+                        if name:
+                            declarations[name] = kind.lower() == "integer"
+        return declarations
+
+    @staticmethod
+    def baseName(parameter):
+        return parameter.split("(")[0].strip().lower()
+
+    def isInteger(self, parameter):
+        """ Checks if a parameter, or the elements of an array,
+        are integers.
+        """
+        return self.baseName(parameter) in self.integerParameters
+
+    def getArrays(self):
+        """ Maps the name of every array in the defaults to its section,
+        its name in the defaults and its declared bounds. The upper bound
+        is None if it is not declared.
+        """
+        arrayDict = {}
+        regex = re.compile(r"(\w+)\((.*)\)$")
+        for section, paramDict in self.dataDict.items():
+            for parameter in paramDict.keys():
+                match = regex.match(parameter)
+                if not match:
+                    continue
+                name, bounds = match.groups()
+                lower, upper = 1, None
+                if ":" in bounds:
+                    lower, upper = [b.strip() for b in bounds.split(":")]
+                    lower = int(lower) if lower else 1
+                    upper = array_dimensions.get(upper, None) \
+                        if not upper.isdigit() else int(upper)
+                if name not in arrayDict or upper is not None:
+                    arrayDict[name] = (section, parameter, (lower, upper))
+        return arrayDict
+
+    def findParameter(self, parameter):
+        """ Looks a parameter up in the defaults without checking its value.
+
+        Args:
+            parameter (str): Parameter name, array elements and slices
+                             such as x_ctrl(3) or x_ctrl(1:4) included.
+
+        Returns:
+            tuple: The section, the name of the parameter in the defaults
+                   and its default value, or ("", None, None) if the
+                   parameter is unknown.
+        """
+        for section, paramDict in self.dataDict.items():
+            if parameter in paramDict.keys():
+                return section, parameter, paramDict[parameter]
+
+        name = parameter.split("(")[0].strip()
+        if name in self.arrayDict and "(" in parameter:
+            section, default, _ = self.arrayDict[name]
+            return section, default, self.dataDict[section][default]
+        return "", None, None
 
     def readMesaDirs(self, envVar):
         try:
@@ -32,43 +129,20 @@ class MesaEnvironmentHandler(IMesaInterface):
         return mesaDir, defaultsDir
 
     def checkParameter(self, parameter, value=None):
-        regex = r'(\w*) (\( [0-9]+ \))'
-        x_ctrls = ['x_ctrl', 'x_integer_ctrl', 'x_logical_ctrl']
-        for section, paramDict in self.dataDict.items():
-            if parameter in paramDict.keys():
-                if (value is None or
-                        type(value) == type(paramDict[parameter])):
-                    return section, paramDict[parameter]
-                elif (isinstance(value, int) and
-                        isinstance(paramDict[parameter], float)):
-                    return section, paramDict[parameter]
-                else:
-                        raise TypeError('Type ' + str(type(value)) +
-                                        ' for parameter ' + parameter +
-                                        ' is wrong, expected type ' +
-                                        str(type(paramDict[parameter])))
-            else:
-                match = re.search(regex, parameter, re.VERBOSE)
-                if(match):
-                    prefix = match.group(1)
-                    if(prefix in x_ctrls):
-                        suffix = '(1:num_x_ctrls)'
-                    else:
-                        suffix = '(:)'
-                    p = prefix + suffix
-
-                    if(p in paramDict.keys()):
-                        if (value is None or
-                                type(value) == type(paramDict[p])):
-                            return section, paramDict[p]
-                        elif (isinstance(value, int) and
-                                isinstance(paramDict[p], float)):
-                            return section, paramDict[p]
-                        else:
-                            raise TypeError('Type ' + str(type(value)) +
-                                            ' for parameter ' + p +
-                                            ' is wrong, expected type ' +
-                                            str(type(paramDict[parameter])))
-            #  Perhaps re.sub is a better solution?
-
-        return "", value
+        if isinstance(value, np.generic):
+            value = value.item()
+        section, default, defaultValue = self.findParameter(parameter)
+        if section == "":
+            return "", value
+
+        if (value is None or
+                type(value) == type(defaultValue)):
+            return section, defaultValue
+        elif (isinstance(value, int) and not isinstance(value, bool) and
+                isinstance(defaultValue, float)):
+            return section, defaultValue
+        else:
+            raise TypeError('Type ' + str(type(value)) +
+                            ' for parameter ' + default +
+                            ' is wrong, expected type ' +
+                            str(type(defaultValue)))
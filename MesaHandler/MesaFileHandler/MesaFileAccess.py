@@ -1,4 +1,6 @@
+import os
 import re
+import numpy as np
 from collections import OrderedDict
 
 from MesaHandler.support import *
@@ -6,60 +8,102 @@ from MesaHandler.MesaFileHandler.MesaFileInterface import IMesaInterface
 from MesaHandler.MesaFileHandler.MesaEnvironmentHandler import (
     MesaEnvironmentHandler
 )
+from MesaHandler.MesaFileHandler.MesaInlistResolver import MesaInlistResolver
+
+rx_arrayKey = re.compile(r"(\w+)\((.*)\)$")
 
 
 class MesaFileAccess(IMesaInterface):
 
-    def __init__(self):
+    def __init__(self, directory=".", envObject=None):
         IMesaInterface.__init__(self)
-        self.envObject = MesaEnvironmentHandler()
+        self.directory = os.path.abspath(directory)
+        if envObject is None:
+            envObject = MesaEnvironmentHandler()
+        self.envObject = envObject
         self.setupDict()
 
     def setupDict(self):
-        self.dataDict = OrderedDict()
-        for section in sections:
-            self.dataDict[section] = OrderedDict()
-            self.readSections("inlist", section)
+        self.resolver = MesaInlistResolver(self.directory)
+        self.dataDict = self.resolver.resolve("inlist")
+
+    def isStale(self):
+        """ Checks if any file of the chain changed since it was read,
+        other than through this object. Only costs a stat per file.
+        """
+        return any(self.isChanged(path) for path in self.resolver.files)
 
     def readSections(self, filename, section):
-        content = self.readFile(filename)
-        p = re.compile(regex_sections)
-        for matches in p.findall(content):
-            if section is not None and section != matches[0]:
-                continue
-
-            self.dataDict[section][filename] = self.getParameters(matches[1])
-            for externalFile in (
-                    set(self.dataDict[section][filename].keys())
-                    .intersection(external_file_parameters)):
-                self.readSections(
-                    self.dataDict[section][filename][externalFile],
-                    section)
+        self.resolver.dataDict = self.dataDict
+        self.resolver.resolveSection(filename, section)
 
     def __setitem__(self, key, value):
         for section in sections:
             for file, parameteDict in self.dataDict[section].items():
                 if key in parameteDict.keys():
                     self.dataDict[section][file][key] = value
-                    if isinstance(value, bool):
-                        regex = r"(" + key + r".+ =)\s* ([\. \w \.]+)"
-                    elif isinstance(value, str):
-                        regex = r"(" + key + r".+ =)\s* ([\. \w _ ']+)"
-                    elif isinstance(value, float) or isinstance(value, int):
-                        regex = r"(" + key + r".+ =)\s*" + regex_floatingValue
-                    else:
-                        raise AttributeError("Cannot convert type " +
-                                             str(type(value)) +
-                                             "to known type")
-                    substring = r"\1 " + self.convertToFortranType(value)
-                    self.rewriteFile(file, regex, substring)
+                    self.editFile(file, self.replaceValue, key, value)
                     return
 
+    def editFile(self, file, edit, *args):
+        """ Applies an edit to the content of a file.
+
+        The read-modify-write cycle holds an advisory lock on the file, so
+        concurrent editors of a shared include do not lose each other's
+        changes, and the file is replaced atomically. If the file changed
+        since it was read, the edit is applied to the current content and
+        the parameters of the file are read again afterwards.
+        """
+        path = self.resolver.getPath(file)
+        with self.lockFile(path):
+            changed = self.isChanged(path)
+            content = self.readFile(path)
+            content = edit(content, *args)
+            self.replaceFile(path, content)
+            MesaInlistResolver.invalidate(path)
+            if(changed):
+                self.refreshFile(file)
+            else:
+                self.resolver.stamps[path] = self.resolver.getStamp(path)
+
     def rewriteFile(self, file, regex, substring):
-        content = self.readFile(file)
         p = re.compile(regex, re.VERBOSE)
-        content = p.sub(substring, content)
-        self.writeFile(file, content)
+        self.editFile(file, lambda content: p.sub(substring, content))
+
+    def isChanged(self, path):
+        """ Checks if a file was modified since it was last read. """
+        try:
+            return self.resolver.getStamp(path) != \
+                self.resolver.stamps.get(path)
+        except FileNotFoundError:
+            return True
+
+    def refreshFile(self, file):
+        """ Reads the parameters of a file again, for example after it
+        was changed by another process. The includes are not updated.
+        """
+        content = self.resolver.readInlist(self.resolver.getPath(file))
+        for section in sections:
+            if file in self.dataDict[section]:
+                self.dataDict[section][file] = OrderedDict(
+                    content.get(section, {}))
+
+    def refresh(self):
+        """ Reads all files of the chain again that were changed
+        by others since they were last read.
+
+        Returns:
+            list: The changed files.
+        """
+        changed = []
+        for section in sections:
+            for file in self.dataDict[section].keys():
+                if(file not in changed and
+                        self.isChanged(self.resolver.getPath(file))):
+                    changed.append(file)
+        for file in changed:
+            self.refreshFile(file)
+        return changed
 
     def addValue(self, key, value=None):
         section, parmValue = self.envObject.checkParameter(key, value)
@@ -69,23 +113,94 @@ class MesaFileAccess(IMesaInterface):
                            before adding it to the inlist files")
 
         parmValue = parmValue if value is None else value
-        subset = list(set(self.dataDict[section]["inlist"].keys())
-                      .intersection(set(external_file_parameters)))
-
-        if len(subset) != 0:
-            usedFile = self.dataDict[section]["inlist"][subset[0]]
-        else:
-            usedFile = "inlist"
+        usedFile = self.getUsedFile(section)
 
         if key in self.dataDict[section][usedFile].keys():
             self.__setitem__(key, parmValue)
         else:
-            regex = r"(&" + section + r"[\w_\s\.\'\=\!\(\)\/\>\<\-\,]+)(\/)"
-            substring = (r"\1\n    " + key + " = " +
-                         self.convertToFortranType(value) + r"\n\2")
-            self.rewriteFile(usedFile, regex, substring)
+            self.editFile(usedFile, self.insertValue, section, key, parmValue)
             self.dataDict[section][usedFile][key] = parmValue
 
+    def getUsedFile(self, section):
+        """ Returns the file new values of a section are added to. """
+        includes = self.resolver.includes[section].get("inlist", [])
+
+        if len(includes) != 0:
+            return includes[0]
+        else:
+            return "inlist"
+
+    def setArray(self, name, first, values):
+        """ Assigns consecutive elements of an array in one operation.
+
+        Assignments to elements in the range are removed from all files
+        and replaced by a single compact assignment such as
+        x_ctrl(1:5) = 3*0.5, 1d0, 2d0.
+
+        Args:
+            name (str): Name of the array, e.g. x_ctrl.
+            first (int): Index of the first element to assign.
+            values (array_like): Values of the elements.
+        """
+        values = np.asarray(values)
+        if values.ndim != 1 or len(values) == 0:
+            raise ValueError("Expected a non-empty one-dimensional array "
+                             "for " + name)
+        last = first + len(values) - 1
+
+        element = "{}({})".format(name, first)
+        section, _ = self.envObject.checkParameter(element, values[0])
+        if section == "" or name not in self.envObject.arrayDict:
+            raise KeyError("The array " + name + " is not available "
+                           "through Mesa.")
+        lower, upper = self.envObject.arrayDict[name][2]
+        if first < lower or (upper is not None and last > upper):
+            raise IndexError("Elements {} to {} are out of the bounds of {}"
+                             .format(first, last, name))
+
+        for file, parameterDict in self.dataDict[section].items():
+            covered = []
+            for key, value in parameterDict.items():
+                span = self.arraySpan(key, value)
+                if (span is not None and span[0] == name and
+                        span[1] >= first and span[2] <= last):
+                    covered.append(key)
+            if covered:
+                for key in covered:
+                    del parameterDict[key]
+                self.editFile(file, self.deleteValues, covered)
+
+        if len(values) == 1:
+            key, value = element, values[0].item()
+        else:
+            key, value = "{}({}:{})".format(name, first, last), values
+        usedFile = self.getUsedFile(section)
+        self.editFile(usedFile, self.insertValue, section, key, value)
+        self.dataDict[section][usedFile][key] = value
+
+    def deleteValues(self, content, keys):
+        for key in keys:
+            content = self.deleteValue(content, key)
+        return content
+
+    def arraySpan(self, key, value):
+        """ Returns the array name and the first and last element assigned
+        by a parameter, or None if it is not an array assignment.
+        """
+        match = rx_arrayKey.match(key)
+        if not match or "," in match.group(2):
+            return None
+        name, index = match.groups()
+        lower = (self.envObject.arrayDict[name][2][0]
+                 if name in self.envObject.arrayDict else 1)
+        bound = index.split(":")[0].strip()
+        try:
+            first = int(bound) if bound else lower
+        except ValueError:
+            return None
+        count = len(value) if isinstance(value, np.ndarray) else 1
+        return name, first, first + count - 1
+
     def removeValue(self, key):
         section, _ = self.envObject.checkParameter(key)
 
@@ -102,6 +217,4 @@ class MesaFileAccess(IMesaInterface):
         for file, parameteDict in self.dataDict[section].items():
             if key in parameteDict.keys():
                 del self.dataDict[section][file][key]
-                regex = r"\s" + key + ".+"
-                substring = ""
-                self.rewriteFile(file, regex, substring)
+                self.editFile(file, self.deleteValue, key)
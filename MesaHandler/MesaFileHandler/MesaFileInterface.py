@@ -1,8 +1,22 @@
+import os
 import re
+import tempfile
+import numpy as np
+from shutil import copymode
 from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # no advisory locks on Windows
+    fcntl = None
 
 from MesaHandler.support import *
 
+rx_read_parameter = re.compile(regex_read_parameter, flags=re.MULTILINE)
+rx_floatingValue = re.compile(regex_floatingValue, re.VERBOSE)
+rx_repeatedValue = re.compile(regex_repeatedValue)
+
 
 class IMesaInterface:
 
@@ -11,9 +25,8 @@ class IMesaInterface:
 
     def getParameters(self, text):
         parameters = OrderedDict()
-        p = re.compile(regex_read_parameter, flags=re.MULTILINE)
 
-        for matches in p.findall(text):
+        for matches in rx_read_parameter.findall(text):
             if len(matches) != 2:
                 raise AttributeError("Regex needs to match 2 items here! \
                                       Found " + str(len(matches)))
@@ -22,8 +35,12 @@ class IMesaInterface:
         return parameters
 
     def convertToPythonTypes(self, data):
-        rx = re.compile(regex_floatingValue, re.VERBOSE)
-        if data[0] == "." and data[-1] == ".":  # return boolean
+        rx = rx_floatingValue
+        if (("," in data and not (data[0] == "'" and data[-1] == "'" and
+                                  data.count("'") == 2)) or
+                rx_repeatedValue.match(data)):  # return array
+            return self.convertArrayToPythonTypes(data)
+        elif data[0] == "." and data[-1] == ".":  # return boolean
             return True if data[1:-1] == "true" else False
         elif data[0] == "'":  # return string
             return data[1:-1]
@@ -44,36 +61,170 @@ class IMesaInterface:
             raise AttributeError("Cannot convert " + data +
                                  "to known type!")
 
+    def convertArrayToPythonTypes(self, data):
+        """ Converts a list of values such as 1d0, 2*0.5 to a numpy array.
+        """
+        values = []
+        for token in data.split(","):
+            token = token.strip()
+            match = rx_repeatedValue.match(token)
+            if match:
+                values.extend([match.group(2)] * int(match.group(1)))
+            else:
+                values.append(token)
+
+        values = np.array(values)
+        if values[0][0] == ".":
+            return np.char.lower(values) == ".true."
+        elif values[0][0] == "'":
+            return np.char.strip(values, "'")
+        if not any(c in token for token in values for c in ".dDeE"):
+            return values.astype(int)
+        values = np.char.replace(np.char.replace(values, "d", "e"), "D", "E")
+        return values.astype(float)
+
     def convertToFortranType(self, data):
+        if isinstance(data, (np.ndarray, list, tuple)):
+            return self.convertArrayToFortranType(np.asarray(data))
+        if isinstance(data, np.generic):
+            data = data.item()
+
         if isinstance(data, bool):
             return "." + ("true" if data else "false") + "."
         elif isinstance(data, str):
             return "'" + data + "'"
-        elif isinstance(data, float) or isinstance(data, int):
-            if(isinstance(data, int)):
-                datastr = '{:.0f}'.format(data)
-            else:
-                datastr = '{:.4E}'.format(data)
-                if(int(datastr[-1]) >= 2 or int(datastr[-2]) != 0):
-                    datastr = datastr.replace('E', 'd')
-                    if('+' in datastr):
-                        datastr = datastr.replace('+', '')
-                    if(int(datastr[-2]) == 0):
-                        datastr = datastr[:-2] + datastr[-1:]
-                else:
-                    datastr = str(data)
-            return datastr
+        elif isinstance(data, int):
+            return str(data)
+        elif isinstance(data, float):
+            return self.formatFloat(data)
         else:
             raise AttributeError("Cannot convert type " + str(type(data)) +
                                  "to known type")
 
+    def convertArrayToFortranType(self, data):
+        """ Converts an array to a compact list of Fortran values, using
+        repeat counts for runs of equal values, e.g. 3*0.5d0, 1d0.
+        """
+        uniques, inverse = np.unique(data, return_inverse=True)
+        tokens = [self.convertToFortranType(value)
+                  for value in uniques.tolist()]
+        inverse = inverse.ravel()
+        starts = np.flatnonzero(np.r_[True, inverse[1:] != inverse[:-1]])
+        counts = np.diff(np.r_[starts, len(inverse)])
+        return ", ".join(tokens[inverse[start]] if count == 1 else
+                         str(count) + "*" + tokens[inverse[start]]
+                         for start, count in zip(starts, counts))
+
+    @staticmethod
+    def formatFloat(data):
+        """ Formats a float with the fewest digits that still read back
+        exactly, using the double precision exponent for large and
+        small values, e.g. 0.5, 4.6d9 or 1.234567d-5.
+        """
+        if data == 0 or not np.isfinite(data) or 1e-3 <= abs(data) < 1e4:
+            return repr(data)
+        mantissa, exponent = np.format_float_scientific(
+            data, unique=True, trim="-").split("e")
+        return mantissa + "d" + str(int(exponent))
+
+    def replaceValue(self, content, key, value):
+        """ Replaces the value of every assignment to key in content. """
+        regex = (r"^([ \t]*" + re.escape(key) + r"[ \t]*=[ \t]*)" +
+                 r"([^!\n]*?)([ \t]*(?:!.*)?)$")
+        fortranValue = self.convertToFortranType(value)
+        return re.sub(regex, lambda m: m.group(1) + fortranValue + m.group(3),
+                      content, flags=re.MULTILINE)
+
+    def insertValue(self, content, section, key, value):
+        """ Adds an assignment to key at the end of a section in content. """
+        regex = r"(^[ \t]*&" + section + r"\b.*?\n)([ \t]*/)"
+        line = "    " + key + " = " + self.convertToFortranType(value) + "\n"
+        return re.sub(regex, lambda m: m.group(1) + line + m.group(2),
+                      content, count=1, flags=re.MULTILINE | re.DOTALL)
+
+    def deleteValue(self, content, key):
+        """ Removes every assignment to key from content. """
+        regex = r"^[ \t]*" + re.escape(key) + r"[ \t]*=.*\n?"
+        return re.sub(regex, "", content, flags=re.MULTILINE)
+
     def readFile(self, fileName):
         with open(fileName) as f:
             return f.read()
 
     def writeFile(self, fileName, content):
-        with open(fileName, 'w') as f:
-            f.write(content)
+        self.replaceFile(fileName, content)
+
+    def replaceFile(self, fileName, content):
+        """ Writes a file atomically through a temporary file that
+        replaces it, so readers never see a partially written file and
+        a crashing writer leaves the old file intact. A symlink is
+        followed, so the file it points to is replaced.
+        """
+        fileName = os.path.realpath(fileName)
+        directory, name = os.path.split(fileName)
+        fd, tmpName = tempfile.mkstemp(dir=directory, prefix="." + name + ".")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(fileName):
+                copymode(fileName, tmpName)
+            else:  # mkstemp creates the file with mode 0600
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmpName, 0o666 & ~umask)
+            os.replace(tmpName, fileName)
+        except BaseException:
+            if os.path.exists(tmpName):
+                os.remove(tmpName)
+            raise
+        self.syncDirectory(directory)
+
+    @staticmethod
+    def syncDirectory(directory):
+        """ Makes a rename in a directory durable, where supported. """
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    @contextmanager
+    def lockFile(fileName):
+        """ Holds an exclusive advisory lock on a file for a read-modify-write
+        cycle. The lock is taken on a hidden .<name>.lock file next to it,
+        or next to the file a symlink points to, because replaceFile swaps
+        the inode of the file itself, and the lock file is removed again
+        when the lock is released. Without fcntl the lock is a no-op.
+        """
+        if fcntl is None:
+            yield
+            return
+        directory, name = os.path.split(os.path.realpath(fileName))
+        lockName = os.path.join(directory, "." + name + ".lock")
+        while True:
+            f = open(lockName, 'a')
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            # the previous holder may have removed the file we locked
+            try:
+                if os.stat(lockName).st_ino == os.fstat(f.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()
+        try:
+            yield
+        finally:
+            os.remove(lockName)
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            f.close()
 
     def items(self):
         return self.dataDict.items()
@@ -0,0 +1,157 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from MesaHandler.support import *
+from MesaHandler.MesaFileHandler.MesaFileInterface import IMesaInterface
+
+
+class MesaInlistResolver(IMesaInterface):
+    """ Resolves a chain of inlists by following the extra_*_inlistN_name
+    parameters of every section.
+
+    Every file is read and split into its sections only once. The parsed
+    files are cached across instances, keyed by their path, modification
+    and change times, size, inode and device, so opening an unchanged chain
+    again only costs a stat per file. The change time catches files copied
+    over with their modification time preserved, and the inode catches
+    files replaced by a copy where timestamps are coarse.
+
+    Attributes:
+        directory (str): Absolute directory the inlist names are relative to.
+        includes (OrderedDict): For every section, maps each file to the
+                                list of files it includes.
+        files (list): Paths of all the files in the chain.
+        strict (bool): Raise if an inlist is missing, instead of
+                       recording it in missing.
+        missing (list): (section, filename) of the missing inlists.
+        stamps (dict): (mtime, ctime, size, inode, device) of every file
+                       when it was last read, keyed by path.
+    """
+
+    cacheSize = 1024
+    _cache = OrderedDict()
+    _cacheLock = threading.Lock()
+
+    def __init__(self, directory=".", strict=True):
+        IMesaInterface.__init__(self)
+        self.directory = os.path.abspath(directory)
+        self.strict = strict
+        self.includes = OrderedDict()
+        self.files = []
+        self.missing = []
+        self.stamps = {}
+
+    def resolve(self, inlist="inlist"):
+        """ Reads all sections of an inlist and of the files it includes.
+
+        Returns:
+            OrderedDict: The parameters of each file for every section.
+        """
+        self.dataDict = OrderedDict()
+        self.includes = OrderedDict()
+        self.files = []
+        self.missing = []
+        for section in sections:
+            self.dataDict[section] = OrderedDict()
+            self.includes[section] = OrderedDict()
+            self.resolveSection(inlist, section)
+
+        return self.dataDict
+
+    def resolveParameters(self, inlist="inlist"):
+        """ Resolves an inlist chain into the values MESA uses, with
+        later files of a section overriding earlier ones.
+
+        Returns:
+            OrderedDict: The value of every parameter set in the chain.
+        """
+        parameters = OrderedDict()
+        for fileDict in self.resolve(inlist).values():
+            for fileParameters in fileDict.values():
+                parameters.update(fileParameters)
+        return parameters
+
+    def resolveSection(self, filename, section, chain=()):
+        path = self.getPath(filename)
+        if path in chain:
+            raise ValueError("Cyclic include of " + filename + " in the " +
+                             section + " section: " +
+                             " -> ".join(chain + (path,)))
+
+        if not self.strict and not os.path.isfile(path):
+            self.missing.append((section, filename))
+            return
+        if path not in self.files:
+            self.files.append(path)
+        content = self.readInlist(path)
+        if section not in content:
+            return
+
+        parameters = OrderedDict(content[section])
+        self.dataDict[section][filename] = parameters
+        self.includes[section][filename] = self.getIncludes(parameters,
+                                                            section)
+        for externalFile in self.includes[section][filename]:
+            self.resolveSection(externalFile, section, chain + (path,))
+
+    @staticmethod
+    def getIncludes(parameters, section):
+        """ Returns the files a section includes, in the order MESA
+        reads them. Both the inlistN_name and the newer inlist_name(N)
+        spellings are supported.
+        """
+        includes = []
+        for n in extra_inlist_numbers:
+            for flag, name in [
+                    ("read_extra_{}_inlist{}".format(section, n),
+                     "extra_{}_inlist{}_name".format(section, n)),
+                    ("read_extra_{}_inlist({})".format(section, n),
+                     "extra_{}_inlist_name({})".format(section, n))]:
+                if parameters.get(flag) is True and name in parameters:
+                    includes.append(parameters[name])
+        return includes
+
+    def getPath(self, filename):
+        return os.path.abspath(os.path.join(self.directory, filename))
+
+    def readInlist(self, path):
+        """ Reads and tokenizes an inlist, using the cache if the file
+        did not change since it was last read.
+
+        Returns:
+            OrderedDict: The parameters of every section in the file.
+        """
+        stamp = self.getStamp(path)
+        self.stamps[path] = stamp
+        with self._cacheLock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == stamp:
+                self._cache.move_to_end(path)
+                return cached[1]
+
+        content = OrderedDict()
+        p = re.compile(regex_sections)
+        for matches in p.findall(self.readFile(path)):
+            parameters = content.setdefault(matches[0], OrderedDict())
+            parameters.update(self.getParameters(matches[1]))
+
+        with self._cacheLock:
+            self._cache[path] = (stamp, content)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cacheSize:
+                self._cache.popitem(last=False)
+        return content
+
+    @staticmethod
+    def getStamp(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_ctime_ns, stat.st_size,
+                stat.st_ino, stat.st_dev)
+
+    @classmethod
+    def invalidate(cls, path):
+        """ Removes a file from the cache. """
+        with cls._cacheLock:
+            cls._cache.pop(os.path.abspath(path), None)
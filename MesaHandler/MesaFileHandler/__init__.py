@@ -1,3 +1,4 @@
 from .MesaEnvironmentHandler import *
 from .MesaFileInterface import *
+from .MesaInlistResolver import *
 from .MesaFileAccess import *
@@ -1,6 +1,12 @@
 import os
+import fnmatch
 from shutil import copyfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from MesaHandler import MesaAccess
+from MesaHandler.MesaFileHandler import (
+    IMesaInterface, MesaEnvironmentHandler, MesaInlistResolver
+)
 
 
 class MesaInlist:
@@ -34,12 +40,92 @@ class MesaInlist:
         if(os.path.isfile('inlist')):
             os.remove('inlist')
         copyfile(self.inlist_name, 'inlist')
-        self.inlist = MesaAccess()
+        self.inlist = MesaAccess.cached()
 
     def finish_edit(self):
         """ Finalizes the editing process by replacing the original file """
         os.replace('inlist', self.inlist_name)
 
+    def bulk_edit(self, changes, inlists=None, pattern=None, processes=None):
+        """ Applies parameter changes to several inlists in one pass.
+
+        The defaults are parsed once and every inlist is edited in place
+        and replaced atomically. Unlike prepare_edit, only the inlists
+        themselves are edited, not the files they include. Parameters of
+        a section that an inlist does not contain are left out.
+
+        Args:
+            changes (dict): New values, keyed by parameter name.
+            inlists (list): Inlists to edit, defaults to self.inlists.
+            pattern (str): Only edit the inlists matching this glob pattern.
+            processes (int): Number of inlists edited in parallel.
+
+        Returns:
+            OrderedDict: For every inlist, the (old, new) values of the
+                         changed parameters. Old values of added
+                         parameters are None.
+        """
+        envObject = MesaEnvironmentHandler()
+        changeSections = OrderedDict()
+        for key, value in changes.items():
+            section, _ = envObject.checkParameter(key, value)
+            if section == "":
+                raise KeyError("The parameter " + key +
+                               " is not available through Mesa.")
+            changeSections[key] = section
+
+        inlists = self.inlists if inlists is None else inlists
+        if pattern is not None:
+            inlists = fnmatch.filter(inlists, pattern)
+
+        def edit_support(inlist_name):
+            return self.edit_file(inlist_name, changes, changeSections)
+
+        with ThreadPoolExecutor(processes or os.cpu_count()) as executor:
+            summaries = list(executor.map(edit_support, inlists))
+
+        return OrderedDict(zip(inlists, summaries))
+
+    @staticmethod
+    def edit_file(inlist_name, changes, changeSections):
+        """ Applies parameter changes to a single inlist.
+
+        Args:
+            inlist_name (str): Inlist to edit.
+            changes (dict): New values, keyed by parameter name.
+            changeSections (dict): Section of each parameter.
+
+        Returns:
+            OrderedDict: The (old, new) values of the changed parameters.
+        """
+        interface = IMesaInterface()
+        resolver = MesaInlistResolver()
+        with interface.lockFile(inlist_name):
+            fileSections = resolver.readInlist(resolver.getPath(inlist_name))
+            content = interface.readFile(inlist_name)
+
+            summary = OrderedDict()
+            for key, value in changes.items():
+                section = changeSections[key]
+                if section not in fileSections:
+                    continue
+                if key in fileSections[section]:
+                    old = fileSections[section][key]
+                    if(old == value and
+                            isinstance(old, bool) == isinstance(value, bool)):
+                        continue
+                    content = interface.replaceValue(content, key, value)
+                else:
+                    old = None
+                    content = interface.insertValue(content, section, key,
+                                                    value)
+                summary[key] = (old, value)
+
+            if(summary):
+                interface.replaceFile(inlist_name, content)
+                MesaInlistResolver.invalidate(inlist_name)
+        return summary
+
     def get_X(self, Z):
         """ Calculates the hydrogen fraction given
             a heavy-element fraction Z and assuming protosolar
@@ -0,0 +1,188 @@
+# Reads MESA history and profile files
+import os
+import re
+import shlex
+import numpy as np
+from collections import OrderedDict
+
+from MesaHandler.support import *
+
+# Fortran drops the exponent letter for three digit exponents,
+# e.g. 1.234-100 instead of 1.234E-100
+regex_fortranExponent = re.compile(r"(\d)([+-]\d{3})$")
+
+
+class MesaLogReader:
+    """ Reads MESA history and profile files.
+
+    Compressed files (.gz, .zst) are read transparently and only the
+    parts of the file that are needed are loaded, which keeps reading
+    headers or the last row of a large file cheap.
+
+    Attributes:
+        file_name (str): Name of the file that is read.
+    """
+
+    # number of lines before the first data row
+    preamble_lines = 6
+
+    def __init__(self, file_name):
+        """ __init__ method
+
+        Args:
+            file_name (str): History or profile file. If it does not exist,
+                             a compressed version of it is read instead.
+        """
+        self.file_name = find_log(file_name)
+        self._header = None
+        self._column_names = None
+        self._preamble_size = None
+
+    @property
+    def compressed(self):
+        """ bool: Whether the file is compressed. """
+        return self.file_name.endswith(tuple(compression_suffixes.values()))
+
+    @property
+    def preamble_size(self):
+        """ int: Number of bytes before the first data row. """
+        if self._preamble_size is None:
+            self.read_preamble()
+        return self._preamble_size
+
+    @property
+    def header(self):
+        """ OrderedDict: Header values, read from the first lines only. """
+        if self._header is None:
+            self.read_preamble()
+        return self._header
+
+    @property
+    def column_names(self):
+        """ list: Names of the data columns. """
+        if self._column_names is None:
+            self.read_preamble()
+        return self._column_names
+
+    def read_preamble(self):
+        """ Reads the header and the column names. """
+        with open_log(self.file_name, "rb") as f:
+            lines = [f.readline() for _ in range(self.preamble_lines)]
+        self._preamble_size = sum(len(line) for line in lines)
+        lines = [line.decode() for line in lines]
+
+        names = lines[1].split()
+        values = [self.to_value(v) for v in shlex.split(lines[2])]
+        self._header = OrderedDict(zip(names, values))
+        self._column_names = lines[5].split()
+
+    def data(self, columns=None):
+        """ Loads the data columns.
+
+        Args:
+            columns (list): Names of the columns to load,
+                            defaults to all columns.
+
+        Returns:
+            OrderedDict: Arrays of the columns, keyed by their names.
+        """
+        names = self.column_names if columns is None else list(columns)
+        usecols = [self.column_names.index(name) for name in names]
+
+        try:
+            with open_log(self.file_name) as f:
+                values = np.loadtxt(f, skiprows=self.preamble_lines,
+                                    usecols=usecols, ndmin=2)
+        except ValueError:
+            # slow path for values such as 1.234-100
+            rows = []
+            with open_log(self.file_name) as f:
+                for _ in range(self.preamble_lines):
+                    f.readline()
+                for line in f:
+                    tokens = line.split()
+                    if tokens:
+                        rows.append([self.to_value(tokens[i])
+                                     for i in usecols])
+            values = np.array(rows, dtype=float).reshape(-1, len(usecols))
+
+        return OrderedDict((name, values[:, i])
+                           for i, name in enumerate(names))
+
+    def last_row(self):
+        """ Reads the last data row.
+
+        Uncompressed files are read backwards from their end,
+        compressed files are streamed.
+
+        Returns:
+            OrderedDict: Values of the last row keyed by the column names,
+                         or None if the file has no data rows yet.
+        """
+        names = self.column_names
+        if(self.compressed):
+            line = None
+            with open_log(self.file_name) as f:
+                for _ in range(self.preamble_lines):
+                    f.readline()
+                for candidate in f:
+                    if candidate.strip():
+                        line = candidate
+        else:
+            line = self.read_last_line()
+
+        if line is None:
+            return None
+        values = [self.to_value(v) for v in line.split()]
+        if len(values) != len(names):  # partially written row
+            return None
+        return OrderedDict(zip(names, values))
+
+    def read_last_line(self, block_size=8192):
+        """ Reads the last non-empty line after the preamble
+            of an uncompressed file.
+
+        Args:
+            block_size (int): Number of bytes read per step.
+
+        Returns:
+            str: The line, or None if there are no data rows.
+        """
+        if self._preamble_size is None:
+            self.read_preamble()
+        with open(self.file_name, "rb") as f:
+            end = f.seek(0, os.SEEK_END)
+            start = end
+            buffer = b""
+            while start > self._preamble_size:
+                start = max(self._preamble_size, start - block_size)
+                f.seek(start)
+                buffer = f.read(end - start)
+                lines = buffer.rstrip().rsplit(b"\n", 1)
+                if len(lines) == 2 or start == self._preamble_size:
+                    line = lines[-1].strip()
+                    return line.decode() if line else None
+        return None
+
+    @staticmethod
+    def to_value(token):
+        """ Converts a token of a MESA output file to a python type.
+
+        Args:
+            token (str): Token to convert.
+
+        Returns:
+            int, float or str
+        """
+        try:
+            return int(token)
+        except ValueError:
+            pass
+        try:
+            return float(token.replace("D", "E").replace("d", "e"))
+        except ValueError:
+            pass
+        match = regex_fortranExponent.search(token)
+        if match:
+            return float(regex_fortranExponent.sub(r"\1E\2", token))
+        return token.strip('"')
@@ -0,0 +1,298 @@
+# Monitors running MESA models without pgstar
+import os
+import html
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from socketserver import ThreadingMixIn
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+from MesaHandler.MesaFileHandler import MesaInlistResolver
+from MesaHandler.MesaLogReader import MesaLogReader
+from MesaHandler.support import *
+
+
+class MesaHistoryTail:
+    """ Follows a growing history file and keeps a downsampled copy
+    of some of its columns.
+
+    Only the lines appended since the last update are read. Once more than
+    max_points rows are kept, every second row is dropped and only every
+    second new row is kept from then on, so the memory and plotting cost
+    stay bounded however long the run is. The last row is always kept.
+
+    Attributes:
+        file_name (str): History file.
+        columns (list): Columns to keep. Missing columns are ignored.
+        max_points (int): Maximum number of rows kept.
+        data (OrderedDict): The kept rows, keyed by column.
+        last_row (OrderedDict): The last row read.
+    """
+
+    def __init__(self, file_name, columns, max_points=2000):
+        self.file_name = file_name
+        self.columns = list(columns)
+        self.max_points = max_points
+        self.reset()
+
+    def reset(self):
+        self.offset = None
+        self.stride = 1
+        self.count = 0
+        self.indices = []
+        self.data = OrderedDict()
+        self.last_row = None
+
+    def update(self):
+        """ Reads the rows appended since the last update.
+
+        Returns:
+            int: Number of rows read.
+        """
+        if not os.path.isfile(self.file_name):
+            return 0
+        size = os.path.getsize(self.file_name)
+        if self.offset is not None and size < self.offset:  # run restarted
+            self.reset()
+        if self.offset is None:
+            reader = MesaLogReader(self.file_name)
+            names = reader.column_names
+            if not names:  # header not written yet
+                return 0
+            self.offset = reader.preamble_size
+            self.names = names
+            self.indices = [names.index(c) for c in self.columns
+                            if c in names]
+            self.data = OrderedDict((names[i], np.empty(0))
+                                    for i in self.indices)
+
+        with open(self.file_name, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        end = chunk.rfind(b'\n') + 1
+        self.offset += end
+
+        rows = []
+        read = 0
+        for line in chunk[:end].decode().splitlines():
+            tokens = line.split()
+            if len(tokens) != len(self.names):
+                continue
+            read += 1
+            self.last_row = OrderedDict(
+                (self.names[i], MesaLogReader.to_value(tokens[i]))
+                for i in self.indices)
+            if self.count % self.stride == 0:
+                rows.append(list(self.last_row.values()))
+            self.count += 1
+        if not rows:
+            return read
+
+        new = np.array(rows, dtype=float).reshape(-1, len(self.indices))
+        for j, name in enumerate(self.data.keys()):
+            self.data[name] = np.append(self.data[name], new[:, j])
+        while len(self.first_column()) > self.max_points:
+            for name in self.data.keys():
+                self.data[name] = self.data[name][::2]
+            self.stride *= 2
+        return read
+
+    def first_column(self):
+        return next(iter(self.data.values()), np.empty(0))
+
+    def series(self, name):
+        """ Returns the kept values of a column, including the last row. """
+        values = self.data[name]
+        # the kept rows are the multiples of the stride
+        if self.last_row is not None and (self.count - 1) % self.stride:
+            values = np.append(values, self.last_row[name])
+        return values
+
+
+class MesaMonitor:
+    """ Lightweight replacement of pgstar for headless runs.
+
+    Follows the history files of many runs from outside of MESA, redraws
+    HR and T-Rho style panels with the non-interactive Agg backend at most
+    once per interval, and writes an index.html overview of all runs that
+    refreshes itself. The overview can be served over HTTP.
+
+    Attributes:
+        run_dirs (list): Run directories to monitor.
+        output_dir (str): Directory for the images and the overview.
+        interval (float): Minimum number of seconds between two redraws.
+        panels (list): (x column, y column, invert x axis) of each panel.
+        tails (OrderedDict): The MesaHistoryTail of each run.
+    """
+
+    def __init__(self, run_dirs, output_dir='monitor', interval=10,
+                 max_points=2000,
+                 panels=(('log_Teff', 'log_L', True),
+                         ('log_center_Rho', 'log_center_T', False))):
+        """ __init__ method
+
+        Args:
+            run_dirs (list): Run directories to monitor.
+            output_dir (str): Directory for the images and the overview.
+            interval (float): Minimum number of seconds between two redraws.
+            max_points (int): Maximum number of points kept per run.
+            panels (list): (x column, y column, invert x axis)
+                           of each panel.
+        """
+        self.run_dirs = list(run_dirs)
+        self.output_dir = output_dir
+        self.interval = interval
+        self.panels = list(panels)
+        self.last_redraw = {}
+        self.pending = set()
+        self._thread = None
+        self._server = None
+        self._stop = threading.Event()
+
+        columns = ['model_number', 'star_age']
+        for x, y, _ in self.panels:
+            columns.extend([x, y])
+        self.tails = OrderedDict(
+            (run_dir, MesaHistoryTail(self.history_file(run_dir),
+                                      OrderedDict.fromkeys(columns),
+                                      max_points))
+            for run_dir in self.run_dirs)
+        os.makedirs(output_dir, exist_ok=True)
+
+    @staticmethod
+    def history_file(run_dir, inlist='inlist'):
+        """ Returns the history file of a run, as set in its inlists. """
+        try:
+            resolver = MesaInlistResolver(run_dir, strict=False)
+            parameters = resolver.resolveParameters(inlist)
+        except (OSError, ValueError):
+            parameters = {}
+        return os.path.join(run_dir, parameters.get('log_directory', 'LOGS'),
+                            parameters.get('star_history_name',
+                                           'history.data'))
+
+    def update(self):
+        """ Reads new history rows and redraws the runs that changed,
+        at most once per interval.
+        """
+        now = time.monotonic()
+        for run_dir, tail in self.tails.items():
+            if(tail.update()):
+                self.pending.add(run_dir)
+            if(run_dir in self.pending and
+                    now - self.last_redraw.get(run_dir, -np.inf) >=
+                    self.interval):
+                self.plot(run_dir)
+                self.pending.discard(run_dir)
+                self.last_redraw[run_dir] = now
+        self.write_overview()
+
+    def plot(self, run_dir):
+        """ Draws the panels of a run into a png file. """
+        tail = self.tails[run_dir]
+        panels = [(x, y, invert) for x, y, invert in self.panels
+                  if x in tail.data and y in tail.data]
+        if not panels:
+            return
+
+        try:  # plotting is optional, import it only when needed
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+        except ImportError:
+            raise ImportError("Plotting the runs requires matplotlib")
+
+        fig = Figure(figsize=(5 * len(panels), 4))
+        FigureCanvasAgg(fig)
+        for i, (x, y, invert) in enumerate(panels):
+            ax = fig.add_subplot(1, len(panels), i + 1)
+            ax.plot(tail.series(x), tail.series(y), lw=1)
+            ax.plot(tail.series(x)[-1:], tail.series(y)[-1:], 'o')
+            ax.set_xlabel(x.replace('_', ' '))
+            ax.set_ylabel(y.replace('_', ' '))
+            if invert:
+                ax.invert_xaxis()
+        fig.suptitle(run_dir)
+        fig.tight_layout()
+
+        file_name = os.path.join(self.output_dir, self.image_name(run_dir))
+        fig.savefig(file_name + '.tmp.png')
+        os.replace(file_name + '.tmp.png', file_name)
+
+    @staticmethod
+    def image_name(run_dir):
+        name = os.path.normpath(run_dir).strip(os.sep).replace(os.sep, '_')
+        return (name or 'run') + '.png'
+
+    def write_overview(self):
+        """ Writes index.html with the state and the images of all runs. """
+        rows = []
+        for run_dir, tail in self.tails.items():
+            last = tail.last_row or {}
+            rows.append(
+                '<tr><td>{}</td><td>{}</td><td>{}</td></tr>'
+                '<tr><td colspan="3"><img src="{}"></td></tr>'.format(
+                    html.escape(run_dir), last.get('model_number', ''),
+                    last.get('star_age', ''),
+                    html.escape(self.image_name(run_dir))))
+        content = ('<!DOCTYPE html>\n<html><head>'
+                   '<meta http-equiv="refresh" content="{}">'
+                   '<title>MESA runs</title></head><body>\n'
+                   '<table><tr><th>run</th><th>model</th><th>age</th></tr>\n'
+                   '{}\n</table></body></html>\n').format(
+                       max(1, int(self.interval)), '\n'.join(rows))
+        file_name = os.path.join(self.output_dir, 'index.html')
+        with open(file_name + '.tmp', 'w') as f:
+            f.write(content)
+        os.replace(file_name + '.tmp', file_name)
+
+    def start(self):
+        """ Updates the monitor in a background thread until stop. """
+        def monitor_support():
+            while not self._stop.is_set():
+                try:
+                    self.update()
+                except Exception as e:  # keep monitoring the other runs
+                    print('Monitor update failed:', repr(e))
+                self._stop.wait(self.interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=monitor_support, daemon=True)
+        self._thread.start()
+
+    def serve(self, port=8000, host='127.0.0.1'):
+        """ Serves the overview over HTTP in a background thread.
+
+        Args:
+            port (int): Port to listen on.
+            host (str): Address to listen on, only the local machine by
+                        default. '' listens on all interfaces.
+        """
+        handler = type('MesaMonitorHandler', (MesaMonitorHandler,),
+                       {'root': os.path.abspath(self.output_dir)})
+        self._server = MesaMonitorServer((host, port), handler)
+        threading.Thread(target=self._server.serve_forever,
+                         daemon=True).start()
+
+    def stop(self):
+        """ Stops the background thread and the HTTP server. """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class MesaMonitorServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MesaMonitorHandler(SimpleHTTPRequestHandler):
+    """ Serves the files of root instead of the working directory. """
+
+    root = '.'
+
+    def translate_path(self, path):
+        path = SimpleHTTPRequestHandler.translate_path(self, path)
+        return os.path.join(self.root, os.path.relpath(path, os.getcwd()))
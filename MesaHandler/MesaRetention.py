@@ -0,0 +1,339 @@
+# Keeps the disk usage of MESA runs within a budget
+import os
+import re
+import queue
+import threading
+from collections import OrderedDict
+
+from MesaHandler.MesaFileHandler import IMesaInterface, MesaInlistResolver
+
+
+class MesaRetention:
+    """ Applies retention policies to the photos, profiles and png files
+    of one or more runs, while they are running or afterwards.
+
+    Planning the deletions only needs directory listings and stats, the
+    deletions themselves are done by a background thread, which apply
+    starts and stop ends. History files are never deleted, neither are
+    the latest photos and the latest profile. When a budget is exceeded,
+    png files are deleted first, oldest first, then photos, then
+    profiles, lowest priority first.
+
+    Note that an active run rewrites its profiles index from memory
+    whenever it saves a profile, which lists deleted profiles again.
+
+    Attributes:
+        run_dirs (list): Run directories.
+        photo_stride (int): Keep only the photos of models whose number
+                            is a multiple of photo_stride.
+        keep_latest (int): Number of most recent photos that are kept.
+        profile_stride (int): Keep the profiles of models whose number is
+                              a multiple of profile_stride.
+        min_priority (int): Keep the profiles with at least this priority.
+        png_keep_latest (int): Number of most recent png files kept
+                               in each png directory.
+        max_bytes_per_run (int): Byte budget of every run.
+        max_bytes (int): Byte budget of all runs together, e.g. of a node.
+    """
+
+    def __init__(self, run_dirs=('.',), photo_stride=None, keep_latest=2,
+                 profile_stride=None, min_priority=None,
+                 png_keep_latest=None, max_bytes_per_run=None,
+                 max_bytes=None, inlist='inlist'):
+        """ __init__ method
+
+        Args:
+            run_dirs (list): Run directories.
+            photo_stride (int): Keep only the photos of models whose number
+                                is a multiple of photo_stride. All photos
+                                are kept if None.
+            keep_latest (int): Number of most recent photos that are kept.
+            profile_stride (int): Keep the profiles of models whose number
+                                  is a multiple of profile_stride.
+            min_priority (int): Keep the profiles with at least this
+                                priority. All profiles are kept if neither
+                                profile_stride nor min_priority is set.
+            png_keep_latest (int): Number of most recent png files kept
+                                   in each png directory, all if None.
+            max_bytes_per_run (int): Byte budget of every run.
+            max_bytes (int): Byte budget of all runs together.
+            inlist (str): Root inlist of the runs, which sets the names
+                          of the photo, log and profile files.
+        """
+        self.run_dirs = list(run_dirs)
+        self.photo_stride = photo_stride
+        self.keep_latest = keep_latest
+        self.profile_stride = profile_stride
+        self.min_priority = min_priority
+        self.png_keep_latest = png_keep_latest
+        self.max_bytes_per_run = max_bytes_per_run
+        self.max_bytes = max_bytes
+        self.inlist = inlist
+
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._deleter = None
+
+    def plan(self):
+        """ Plans the deletions without deleting anything.
+
+        Returns:
+            OrderedDict: The files to delete, keyed by path.
+            OrderedDict: The scanned runs, keyed by directory.
+        """
+        deletions = OrderedDict()
+        runs = OrderedDict((run_dir, self.scan(run_dir))
+                           for run_dir in self.run_dirs)
+
+        candidates = []
+        for run in runs.values():
+            deletions.update(self.plan_policies(run))
+            candidates.extend(self.plan_budget(run, deletions,
+                                               self.max_bytes_per_run))
+
+        if self.max_bytes is not None:
+            usage = sum(item['size'] for run in runs.values()
+                        for item in run['files'] if item['path']
+                        not in deletions)
+            for item in sorted(candidates, key=self.budget_order):
+                if usage <= self.max_bytes:
+                    break
+                if item['path'] not in deletions:
+                    deletions[item['path']] = item
+                    usage -= item['size']
+        return deletions, runs
+
+    def apply(self, wait=True):
+        """ Plans the deletions and hands them to the background thread.
+
+        Args:
+            wait (bool): Wait until the files are deleted.
+
+        Returns:
+            list: Paths of the files to delete.
+        """
+        deletions, runs = self.plan()
+        with self._lock:
+            if self._deleter is None:
+                self._deleter = threading.Thread(target=self.delete_support,
+                                                 daemon=True)
+                self._deleter.start()
+            paths = [path for path in deletions if path not in self._pending]
+            self._pending.update(paths)
+        for path in paths:
+            self._queue.put(path)
+        for run in runs.values():
+            self.update_index(run, deletions)
+
+        if wait:
+            self._queue.join()
+        return paths
+
+    def start(self, interval=60):
+        """ Applies the policies every interval seconds in a background
+        thread until stop is called.
+        """
+        def retention_support():
+            while not self._stop.is_set():
+                self.apply(wait=False)
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=retention_support,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the periodic retention, waits for pending deletions
+        and ends the deleting thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            deleter, self._deleter = self._deleter, None
+        if deleter is not None:
+            self._queue.put(None)
+            deleter.join()
+
+    def delete_support(self):
+        while True:
+            task = self._queue.get()
+            if task is None:  # sent by stop
+                self._queue.task_done()
+                return
+            try:
+                if callable(task):
+                    task()
+                elif os.path.isfile(task):
+                    os.remove(task)
+            except OSError as e:
+                print('Retention failed for', task, e)
+            finally:
+                with self._lock:
+                    self._pending.discard(task)
+                self._queue.task_done()
+
+    def scan(self, run_dir):
+        """ Lists the photos, profiles and png files of a run. """
+        try:
+            parameters = MesaInlistResolver(
+                run_dir, strict=False).resolveParameters(self.inlist)
+        except (OSError, ValueError):
+            parameters = {}
+        log_dir = os.path.join(run_dir,
+                               parameters.get('log_directory', 'LOGS'))
+        run = {'photos': [], 'profiles': [], 'png': [], 'files': [],
+               'index': os.path.join(log_dir, parameters.get(
+                   'profiles_index_name', 'profiles.index'))}
+
+        photo_dir = os.path.join(run_dir,
+                                 parameters.get('photo_directory', 'photos'))
+        for item in self.list_files(photo_dir):
+            digits = re.sub(r'\D', '', item['name'])
+            item['model'] = int(digits) if digits else None
+            run['photos'].append(item)
+
+        for png_dir in [os.path.join(run_dir, 'png'),
+                        os.path.join(run_dir, 'pgstar_png')]:
+            items = [item for item in self.list_files(png_dir)
+                     if item['name'].endswith('.png')]
+            keep = (len(items) if self.png_keep_latest is None
+                    else self.png_keep_latest)
+            items.sort(key=lambda item: item['mtime'])
+            for i, item in enumerate(items):
+                item['policy'] = i < len(items) - keep
+            run['png'].extend(items)
+
+        prefix = parameters.get('profile_data_prefix', 'profile')
+        suffix = parameters.get('profile_data_suffix', '.data')
+        profiles = {item['name']: item for item in self.list_files(log_dir)}
+        for line in self.read_index(run['index'])[1:]:
+            tokens = line.split()
+            if len(tokens) != 3:
+                continue
+            model, priority, number = [int(t) for t in tokens]
+            name = prefix + str(number) + suffix
+            files = [item for key, item in profiles.items()
+                     if key == name or key.startswith(name + '.')]
+            run['profiles'].append({'model': model, 'priority': priority,
+                                    'line': line, 'files': files})
+
+        run['files'] = (run['photos'] + run['png'] +
+                        list(profiles.values()))
+        return run
+
+    def plan_policies(self, run):
+        """ Returns the files deleted by the photo, profile
+        and png policies.
+        """
+        deletions = OrderedDict()
+        latest = self.latest_photos(run)
+        if self.photo_stride is not None:
+            for item in run['photos']:
+                if (item['path'] not in latest and item['model'] is not None
+                        and item['model'] % self.photo_stride != 0):
+                    deletions[item['path']] = item
+
+        for item in run['png']:
+            if item['policy']:
+                deletions[item['path']] = item
+
+        if self.profile_stride is not None or self.min_priority is not None:
+            last = max([p['model'] for p in run['profiles']], default=None)
+            for profile in run['profiles']:
+                keep = (profile['model'] == last or
+                        (self.profile_stride is not None and
+                         profile['model'] % self.profile_stride == 0) or
+                        (self.min_priority is not None and
+                         profile['priority'] >= self.min_priority))
+                if not keep:
+                    for item in profile['files']:
+                        deletions[item['path']] = item
+        return deletions
+
+    def plan_budget(self, run, deletions, max_bytes):
+        """ Adds the deletions needed to bring a run within max_bytes
+        to deletions and returns all files that may be deleted to keep
+        to a budget, in the order they should be deleted.
+        """
+        latest = self.latest_photos(run)
+        last = max([p['model'] for p in run['profiles']], default=None)
+        for rank, profile in enumerate(sorted(
+                run['profiles'],
+                key=lambda p: (p['priority'], p['model']))):
+            for item in profile['files']:
+                item['rank'] = rank
+
+        candidates = (
+            [dict(item, category=0) for item in run['png']] +
+            [dict(item, category=1) for item in run['photos']
+             if item['path'] not in latest] +
+            [dict(item, category=2) for profile in run['profiles']
+             if profile['model'] != last for item in profile['files']])
+        candidates.sort(key=self.budget_order)
+
+        if max_bytes is not None:
+            usage = sum(item['size'] for item in run['files']
+                        if item['path'] not in deletions)
+            for item in candidates:
+                if usage <= max_bytes:
+                    break
+                if item['path'] not in deletions:
+                    deletions[item['path']] = item
+                    usage -= item['size']
+        return candidates
+
+    @staticmethod
+    def budget_order(item):
+        return (item['category'], item.get('rank', 0), item['mtime'])
+
+    def latest_photos(self, run):
+        photos = sorted(run['photos'], key=lambda item: item['mtime'])
+        return set(item['path'] for item in
+                   photos[len(photos) - self.keep_latest:]
+                   if self.keep_latest > 0)
+
+    def update_index(self, run, deletions):
+        """ Queues a rewrite of the profiles index without the entries
+        of the deleted profiles.
+        """
+        removed = [profile['line'] for profile in run['profiles']
+                   if profile['files'] and
+                   all(item['path'] in deletions
+                       for item in profile['files'])]
+        if not removed:
+            return
+
+        def index_support():
+            lines = self.read_index(run['index'])
+            kept = [line for line in lines[1:] if line not in removed]
+            header = re.sub(r'^\s*\d+', str(len(kept)), lines[0])
+            IMesaInterface().replaceFile(
+                run['index'], '\n'.join([header] + kept) + '\n')
+
+        self._queue.put(index_support)
+
+    @staticmethod
+    def read_index(file_name):
+        if not os.path.isfile(file_name):
+            return []
+        with open(file_name) as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+
+    @staticmethod
+    def list_files(directory):
+        if not os.path.isdir(directory):
+            return []
+        items = []
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                stat = entry.stat()
+                items.append({'path': entry.path, 'name': entry.name,
+                              'size': stat.st_size,
+                              'mtime': stat.st_mtime})
+        return items
@@ -2,13 +2,15 @@
 import os
 import sys
 import glob
+import json
 import subprocess
 import datetime
 import numpy as np
 import mesa_reader as mr
 from shutil import copy2, move
-from distutils.dir_util import copy_tree
 from MesaHandler import MesaAccess
+from MesaHandler.MesaWorkDir import MesaWorkDir
+from MesaHandler.support import compress_file, run_record_name
 
 
 class MesaRunner:
@@ -84,7 +86,7 @@ class MesaRunner:
         self.remove_file('inlist')
         self.remove_file('restart_photo')
         copy2(inlist, 'inlist')
-        ma = MesaAccess()
+        ma = MesaAccess.cached()
         self.model_name = ma['save_model_filename']
         self.profile_name = ma['filename_for_profile_when_terminate']
 
@@ -114,6 +116,7 @@ class MesaRunner:
             print('You need to build star first!')
             sys.exit()
         end_time = datetime.datetime.now()
+        run_seconds = (end_time - start_time).total_seconds()
         run_time = str(end_time - start_time)
         self.run_time = run_time
         micro_index = run_time.find('.')
@@ -159,6 +162,31 @@ class MesaRunner:
                 print(42 * '%')
                 self.convergence = False
 
+        self.write_record(inlist, run_seconds, end_time, ma.items())
+
+    def write_record(self, inlist, run_seconds, end_time, parameters=()):
+        """ Appends the outcome of a run to the run record.
+
+        Args:
+            inlist (str): Inlist that was run.
+            run_seconds (float): Wall time of the run in seconds.
+            end_time (datetime.datetime): Time the run finished.
+            parameters (list): (name, value) of the resolved parameters
+                               of the run. Only scalar values are kept.
+        """
+        record = {'inlist': inlist,
+                  'convergence': bool(self.convergence),
+                  'run_time': run_seconds,
+                  'finished': end_time.isoformat(),
+                  'parameters': {}}
+        for name, value in parameters:
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, (bool, int, float, str)):
+                record['parameters'][name] = value
+        with open(run_record_name, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
     def restart(self, photo):
         """ Restarts the run from the given photo.
 
@@ -191,20 +219,26 @@ class MesaRunner:
         else:
             print('No photo found.')
 
-    def copy_logs(self, dir_name):
+    def copy_logs(self, dir_name, mode='copy', compress=None):
         """ Save the current logs and profile.
 
         Args:
             dir_name (str): Destination to copy the logs to.
+            mode (str): 'copy', 'link' or 'move', see
+                        MesaWorkDir.archive_logs.
+            compress (str): Compress the .data files with 'gzip' or 'zstd'.
         """
         if not(self.profile_name):
-            ma = MesaAccess()
+            ma = MesaAccess.cached()
             self.profile_name = ma['filename_for_profile_when_terminate']
 
         dst = os.path.join(dir_name, self.profile_name)
-        copy_tree('LOGS', dir_name)
+        MesaWorkDir().archive_logs(dir_name, mode=mode, compress=compress)
         if(os.path.isfile(self.profile_name)):
             move(self.profile_name, dst)
+            if(compress is not None):
+                compress_file(dst, codec=compress)
+                os.remove(dst)
 
     @staticmethod
     def make():
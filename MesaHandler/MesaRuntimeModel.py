@@ -0,0 +1,140 @@
+# Predicts the wall time of MESA runs from earlier runs
+import os
+import json
+import numpy as np
+
+from MesaHandler.support import *
+
+
+class MesaRuntimeModel:
+    """ Predicts the wall time of a run from its inlist parameters,
+    using the runs recorded by MesaRunner.
+
+    The prediction is the distance-weighted geometric mean of the wall
+    times of the nearest recorded runs. Distances are measured between
+    the numerical parameters, each scaled by its spread over the records,
+    so parameters of very different magnitude count alike. Parameters that
+    are the same in every record are ignored.
+
+    Attributes:
+        parameters (list): Parameters used to compare runs, all numerical
+                           parameters that vary between records if None.
+        neighbours (int): Number of nearest runs a prediction is based on.
+        records (list): (parameters, wall time in seconds) of every run.
+    """
+
+    def __init__(self, parameters=None, neighbours=5):
+        """ __init__ method
+
+        Args:
+            parameters (list): Parameters used to compare runs, all
+                               numerical parameters that vary between
+                               records if None.
+            neighbours (int): Number of nearest runs a prediction
+                              is based on.
+        """
+        self.parameters = None if parameters is None else list(parameters)
+        self.neighbours = neighbours
+        self.records = []
+        self._fitted = None
+
+    def add(self, parameters, run_time):
+        """ Adds a run.
+
+        Args:
+            parameters (dict): Resolved inlist parameters of the run.
+            run_time (float): Wall time of the run in seconds.
+        """
+        if run_time is None or not run_time > 0:
+            return
+        self.records.append((dict(parameters), float(run_time)))
+        self._fitted = None
+
+    def load(self, directories, converged_only=True):
+        """ Adds the runs recorded in the run directories.
+
+        Args:
+            directories (list): Run directories.
+            converged_only (bool): Leave out runs that did not converge,
+                                   which often stopped early.
+
+        Returns:
+            int: Number of runs added.
+        """
+        count = len(self.records)
+        for directory in directories:
+            record_file = os.path.join(directory, run_record_name)
+            if not os.path.isfile(record_file):
+                continue
+            with open(record_file) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if converged_only and not record.get('convergence'):
+                        continue
+                    if 'parameters' in record:
+                        self.add(record['parameters'],
+                                 record.get('run_time'))
+        return len(self.records) - count
+
+    def fit(self):
+        """ Selects the features and their scales from the records. """
+        names = self.parameters
+        if names is None:
+            names = sorted(set(name for parameters, _ in self.records
+                               for name in parameters))
+        matrix = np.array([[self.to_number(parameters.get(name))
+                            for name in names]
+                           for parameters, _ in self.records], dtype=float)
+        matrix = matrix.reshape(len(self.records), len(names))
+
+        known = np.isfinite(matrix)
+        counts = known.sum(axis=0)
+        filled = np.where(known, matrix, 0)
+        centres = filled.sum(axis=0) / np.maximum(counts, 1)
+        scales = np.sqrt((np.where(known, matrix - centres, 0) ** 2)
+                         .sum(axis=0) / np.maximum(counts, 1))
+        keep = counts > 0
+        if self.parameters is None:
+            keep &= scales > 0
+        scales = np.where(scales > 0, scales, 1.0)
+
+        columns = [name for name, k in zip(names, keep) if k]
+        matrix = np.where(known, matrix, centres)[:, keep]
+        centres, scales = centres[keep], scales[keep]
+        self._fitted = (columns, centres, scales, (matrix - centres) / scales,
+                        np.log([run_time for _, run_time in self.records]))
+
+    def predict(self, parameters):
+        """ Predicts the wall time of a run.
+
+        Args:
+            parameters (dict): Resolved inlist parameters of the run.
+
+        Returns:
+            float: Predicted wall time in seconds, or None
+                   if no runs were recorded.
+        """
+        if not self.records:
+            return None
+        if self._fitted is None:
+            self.fit()
+        columns, centres, scales, matrix, log_times = self._fitted
+
+        point = np.array([self.to_number(parameters.get(name))
+                          for name in columns], dtype=float)
+        point = (np.where(np.isnan(point), centres, point) - centres) / scales
+        distances = np.sqrt(((matrix - point) ** 2).sum(axis=1))
+        nearest = np.argsort(distances, kind='stable')[:self.neighbours]
+        weights = 1 / (distances[nearest] + 1e-6)
+        return float(np.exp(np.average(log_times[nearest], weights=weights)))
+
+    @staticmethod
+    def to_number(value):
+        """ Returns a numerical parameter as a float, and NaN
+        for missing and non-numerical parameters.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return np.nan
+        return float(value)
@@ -0,0 +1,431 @@
+# Runs multi-stage MESA pipelines of many models concurrently
+import os
+import time
+import heapq
+import datetime
+import traceback
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from MesaHandler.MesaFileHandler import MesaInlistResolver
+from MesaHandler.MesaRunner import MesaRunner
+from MesaHandler.support import *
+
+
+class MesaScheduler:
+    """ Runs the stages of many models as a dependency graph.
+
+    A stage is an inlist run in a work directory. A stage depends on the
+    stages that save the model it loads, which is inferred from the
+    save_model_filename and load_model_filename (or saved_model_name)
+    parameters of the stages, and on any stages given explicitly.
+    Stages are started as soon as their dependencies finished, so
+    the stages of different models run concurrently, and a failed
+    stage only skips the stages that depend on it.
+
+    Stages sharing a work directory never run at the same time,
+    because they share its inlist, LOGS and photos. Every model
+    should therefore have its own work directory, see MesaWorkDir.clone.
+
+    With a MesaRuntimeModel, the wall time of every stage is predicted
+    from its parameters and the stages on the longest remaining chains
+    are started first, so long runs do not end up last and leave most
+    processes idle. The model learns from the stages that finish, and
+    the predictions of the pending stages, their ranks and the estimated
+    time left for the campaign are updated every update_interval seconds,
+    after the ready stages were started.
+
+    Attributes:
+        processes (int): Maximum number of stages running at once.
+        pgstar (bool): Enable/disable pgstar.
+        check_age (bool): Check whether the output
+                          model has the desired max_age.
+        stages (OrderedDict): (work directory, inlist) of every stage,
+                              keyed by its name.
+        status (OrderedDict): 'pending', 'running', 'finished', 'failed'
+                              or 'skipped', keyed by stage name.
+        errors (OrderedDict): The errors of the failed stages.
+        runtime_model (MesaRuntimeModel): Predicts the wall time of stages.
+        durations (OrderedDict): Predicted wall time of every stage in
+                                 seconds, keyed by stage name.
+        update_interval (float): Minimum time in seconds between updates
+                                 of the predictions while running.
+    """
+
+    def __init__(self, processes=None, pgstar=False, check_age=False,
+                 runtime_model=None, update_interval=60):
+        """ __init__ method
+
+        Args:
+            processes (int): Maximum number of stages running at once,
+                             defaults to the number of CPUs.
+            pgstar (bool): Enable/disable pgstar.
+            check_age (bool): Check whether the output
+                              model has the desired max_age.
+            runtime_model (MesaRuntimeModel): Predicts the wall time
+                                              of stages, to start the
+                                              longest ones first.
+            update_interval (float): Minimum time in seconds between
+                                     updates of the predictions
+                                     while running.
+        """
+        self.processes = processes or os.cpu_count()
+        self.pgstar = pgstar
+        self.check_age = check_age
+        self.stages = OrderedDict()
+        self.status = OrderedDict()
+        self.errors = OrderedDict()
+        self.runtime_model = runtime_model
+        self.durations = OrderedDict()
+        self.update_interval = update_interval
+        self._depends_on = OrderedDict()
+        self._parameters = {}
+        self._started = {}
+
+    def add(self, inlist, work_dir='.', depends_on=(), name=None):
+        """ Adds a stage.
+
+        Args:
+            inlist (str): Inlist of the stage, relative to the work directory.
+            work_dir (str): Work directory of the stage, relative
+                            to the current directory when it is added.
+            depends_on (list): Names of stages that have to finish
+                               first, in addition to the inferred ones.
+            name (str): Name of the stage, defaults to the path of the inlist.
+
+        Returns:
+            str: Name of the stage.
+        """
+        if name is None:
+            name = os.path.normpath(os.path.join(work_dir, inlist))
+        if name in self.stages:
+            raise KeyError("A stage named " + name + " already exists")
+        for dependency in depends_on:
+            if dependency not in self.stages:
+                raise KeyError("Unknown stage " + dependency)
+
+        self.stages[name] = (os.path.abspath(work_dir), inlist)
+        self.status[name] = 'pending'
+        self._depends_on[name] = list(depends_on)
+        return name
+
+    def add_model(self, work_dir, inlists):
+        """ Adds the stages of a model, which run in the order given.
+
+        Args:
+            work_dir (str): Work directory of the model.
+            inlists (list): Inlists of the stages.
+
+        Returns:
+            list: Names of the stages.
+        """
+        names = []
+        for inlist in inlists:
+            names.append(self.add(inlist, work_dir, depends_on=names[-1:]))
+        return names
+
+    def dependencies(self):
+        """ Returns the given and inferred dependencies of every stage.
+
+        A stage loading a model depends on the last stage added before it
+        that saves this model, or on the last one added after it if no
+        stage before it does.
+
+        Returns:
+            OrderedDict: The set of dependencies, keyed by stage name.
+        """
+        saves = OrderedDict()
+        loads = OrderedDict()
+        for name, (work_dir, inlist) in self.stages.items():
+            saves[name], loads[name] = self.model_files(work_dir, inlist)
+
+        dependencies = OrderedDict()
+        names = list(self.stages.keys())
+        for i, name in enumerate(names):
+            dependencies[name] = set(self._depends_on[name])
+            for path in loads[name]:
+                producers = [other for other in names
+                             if other != name and path in saves[other]]
+                before = [other for other in producers
+                          if names.index(other) < i]
+                if before:
+                    dependencies[name].add(before[-1])
+                elif producers:
+                    dependencies[name].add(producers[-1])
+
+        self.check_cycles(dependencies)
+        return dependencies
+
+    @staticmethod
+    def model_files(work_dir, inlist):
+        """ Returns the absolute paths of the models a stage saves
+        and the models and files it loads.
+        """
+        try:
+            parameters = MesaInlistResolver(
+                work_dir, strict=False).resolveParameters(inlist)
+        except (OSError, ValueError):
+            return set(), set()
+
+        saves = set()
+        if(parameters.get('save_model_when_terminate') is True and
+                parameters.get('save_model_filename')):
+            saves.add(os.path.abspath(os.path.join(
+                work_dir, parameters['save_model_filename'])))
+
+        loads = set()
+        for flag, name in input_file_parameters:
+            if parameters.get(flag) is True and parameters.get(name):
+                loads.add(os.path.abspath(os.path.join(work_dir,
+                                                       parameters[name])))
+        return saves, loads
+
+    @staticmethod
+    def check_cycles(dependencies):
+        """ Raises ValueError if the dependencies contain a cycle. """
+        state = {}
+
+        def visit(name, chain):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError("Cyclic stage dependencies: " +
+                                 " -> ".join(chain + [name]))
+            state[name] = 'visiting'
+            for dependency in sorted(dependencies[name]):
+                visit(dependency, chain + [name])
+            state[name] = 'done'
+
+        for name in dependencies:
+            visit(name, [])
+
+    def ready(self, dependencies, busy, ranks=None):
+        """ Returns the pending stages whose dependencies finished and
+        whose work directory is free, in the order they are started:
+        highest rank first, otherwise in the order they were added.
+        """
+        names = list(self.status.keys())
+        if ranks is not None:
+            names.sort(key=lambda name: -ranks[name])
+        ready = []
+        for name in names:
+            work_dir = self.stages[name][0]
+            if(self.status[name] == 'pending' and work_dir not in busy and
+                    all(self.status[d] == 'finished'
+                        for d in dependencies[name])):
+                ready.append(name)
+                busy = busy | {work_dir}
+        return ready
+
+    def predict_durations(self, names=None):
+        """ Predicts the wall time of stages with the runtime model.
+        Stages it cannot predict get the median of the other predictions,
+        the predictions of the other stages are kept.
+
+        Args:
+            names (list): Names of the stages to predict, all if None.
+
+        Returns:
+            OrderedDict: Predicted wall time in seconds, keyed by stage name.
+        """
+        if names is None:
+            names = list(self.stages.keys())
+        predictions = OrderedDict()
+        for name in names:
+            work_dir, inlist = self.stages[name]
+            if name not in self._parameters:
+                try:
+                    self._parameters[name] = MesaInlistResolver(
+                        work_dir, strict=False).resolveParameters(inlist)
+                except (OSError, ValueError):
+                    self._parameters[name] = {}
+            predictions[name] = (None if self.runtime_model is None else
+                                 self.runtime_model.predict(
+                                     self._parameters[name]))
+
+        known = [p for p in predictions.values() if p is not None]
+        fallback = float(np.median(known)) if known else 0.0
+        for name, p in predictions.items():
+            self.durations[name] = fallback if p is None else p
+        return self.durations
+
+    def ranks(self, dependencies):
+        """ Returns the predicted wall time of the longest chain of stages
+        starting with every stage, the priority of longest processing
+        time first scheduling.
+        """
+        dependents = OrderedDict((name, []) for name in dependencies)
+        for name, others in dependencies.items():
+            for other in others:
+                dependents[other].append(name)
+
+        ranks = {}
+
+        def rank(name):
+            if name not in ranks:
+                ranks[name] = self.durations.get(name, 0.0) + max(
+                    [rank(other) for other in dependents[name]], default=0.0)
+            return ranks[name]
+
+        for name in dependencies:
+            rank(name)
+        return ranks
+
+    def eta(self, dependencies=None, ranks=None):
+        """ Estimates the time left until all stages are done, by
+        simulating the scheduling of the remaining stages with
+        their predicted wall times. The ranks are computed
+        if they are not given.
+
+        Returns:
+            float: Estimated time left in seconds.
+        """
+        if dependencies is None:
+            dependencies = self.dependencies()
+        if not self.durations:
+            self.predict_durations()
+        if ranks is None:
+            ranks = self.ranks(dependencies)
+        order = {name: i for i, name in enumerate(
+            sorted(self.status.keys(), key=lambda name: -ranks[name]))}
+
+        # stages wait for their unfinished dependencies,
+        # and for their work directory if it is busy
+        left = {}
+        dependents = OrderedDict((name, []) for name in dependencies)
+        for name, others in dependencies.items():
+            for other in others:
+                dependents[other].append(name)
+            if self.status[name] in ('pending', 'running'):
+                left[name] = sum(self.status[d] != 'finished'
+                                 for d in others)
+        ready = [(order[name], name) for name, count in left.items()
+                 if count == 0 and self.status[name] == 'pending']
+        heapq.heapify(ready)
+        waiting = {}
+
+        now = time.monotonic()
+        events = []
+        busy = set()
+        for name, status in self.status.items():
+            if status == 'running':
+                elapsed = now - self._started.get(name, now)
+                heapq.heappush(events, (max(self.durations[name] - elapsed,
+                                            0.0), name))
+                busy.add(self.stages[name][0])
+
+        clock = 0.0
+        while True:
+            while ready and len(events) < self.processes:
+                _, name = heapq.heappop(ready)
+                work_dir = self.stages[name][0]
+                if work_dir in busy:
+                    heapq.heappush(waiting.setdefault(work_dir, []),
+                                   (order[name], name))
+                    continue
+                busy.add(work_dir)
+                heapq.heappush(events, (clock + self.durations[name], name))
+            if not events:
+                return clock
+            clock, name = heapq.heappop(events)
+            work_dir = self.stages[name][0]
+            busy.discard(work_dir)
+            if waiting.get(work_dir):
+                heapq.heappush(ready, heapq.heappop(waiting[work_dir]))
+            for other in dependents[name]:
+                if other in left:
+                    left[other] -= 1
+                    if left[other] == 0:
+                        heapq.heappush(ready, (order[other], other))
+
+    def skip_dependents(self, failed, dependencies):
+        """ Marks the pending stages depending on a failed stage
+        as skipped, transitively.
+        """
+        queue = [failed]
+        while queue:
+            name = queue.pop()
+            for other, others in dependencies.items():
+                if name in others and self.status[other] == 'pending':
+                    self.status[other] = 'skipped'
+                    print('Skipping', other, 'since', failed, 'failed')
+                    queue.append(other)
+
+    def run(self):
+        """ Runs all pending stages.
+
+        Returns:
+            OrderedDict: The status of every stage, keyed by its name.
+        """
+        dependencies = self.dependencies()
+        self.predict_durations()
+        ranks = self.ranks(dependencies)
+        running = OrderedDict()
+        busy = set()
+        updated = time.monotonic()
+        with ProcessPoolExecutor(self.processes) as pool:
+            while True:
+                free = self.processes - len(running)
+                for name in self.ready(dependencies, busy,
+                                       ranks)[:max(0, free)]:
+                    work_dir, inlist = self.stages[name]
+                    future = pool.submit(_run_stage, work_dir, inlist,
+                                         self.pgstar, self.check_age)
+                    running[future] = name
+                    busy.add(work_dir)
+                    self.status[name] = 'running'
+                    self._started[name] = time.monotonic()
+                if not running:
+                    break
+
+                if(self.runtime_model is not None and
+                        time.monotonic() - updated >= self.update_interval):
+                    self.predict_durations(
+                        [name for name, status in self.status.items()
+                         if status == 'pending'])
+                    ranks = self.ranks(dependencies)
+                    finished = sum(status not in ('pending', 'running')
+                                   for status in self.status.values())
+                    print('{} of {} stages done, about {} left'.format(
+                        finished, len(self.status), datetime.timedelta(
+                            seconds=round(self.eta(dependencies,
+                                                   ranks)))))
+                    updated = time.monotonic()
+
+                done, _ = wait(list(running.keys()),
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    busy.discard(self.stages[name][0])
+                    try:
+                        converged, error = future.result()
+                    except Exception as e:  # the worker process died
+                        converged, error = False, repr(e)
+                    if(converged):
+                        self.status[name] = 'finished'
+                        if self.runtime_model is not None:
+                            self.runtime_model.add(
+                                self._parameters[name],
+                                time.monotonic() - self._started[name])
+                    else:
+                        self.status[name] = 'failed'
+                        self.errors[name] = error
+                        self.skip_dependents(name, dependencies)
+
+        return OrderedDict(self.status)
+
+
+def _run_stage(work_dir, inlist, pgstar, check_age):
+    """ Runs a single stage in a worker process. """
+    try:
+        os.chdir(work_dir)
+        runner = MesaRunner(inlist, pgstar=pgstar, pause=False)
+        runner.run_support(inlist, check_age)
+    except SystemExit:
+        return False, 'star is not built in ' + work_dir
+    except Exception:
+        return False, traceback.format_exc()
+    if not(runner.convergence):
+        return False, inlist + ' did not converge'
+    return True, None
@@ -0,0 +1,187 @@
+# Validates inlists before MESA is started
+import os
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from MesaHandler.MesaFileHandler import (
+    MesaEnvironmentHandler, MesaInlistResolver
+)
+from MesaHandler.support import *
+
+
+class MesaValidator:
+    """ Checks a whole chain of inlists against the MESA defaults.
+
+    Reports unknown parameters, parameters in the wrong section,
+    values of the wrong type, array indices outside of the declared
+    bounds and references to missing files, without starting MESA.
+
+    Attributes:
+        envObject (MesaEnvironmentHandler): The parsed defaults.
+    """
+
+    def __init__(self, envObject=None):
+        """ __init__ method
+
+        Args:
+            envObject (MesaEnvironmentHandler): Parsed defaults to reuse,
+                                                parsed from MESA_DIR
+                                                if not given.
+        """
+        if envObject is None:
+            envObject = MesaEnvironmentHandler()
+        self.envObject = envObject
+
+    def validate(self, directory='.', inlist='inlist'):
+        """ Validates the inlist chain of a run directory.
+
+        Args:
+            directory (str): Run directory.
+            inlist (str): Root inlist, relative to the directory.
+
+        Returns:
+            list: Descriptions of the problems found, empty if the
+                  chain is valid.
+        """
+        resolver = MesaInlistResolver(directory, strict=False)
+        try:
+            dataDict = resolver.resolve(inlist)
+        except ValueError as e:  # cyclic includes
+            return [str(e)]
+
+        issues = []
+        for section, filename in resolver.missing:
+            including = [f for f, included in resolver.includes[section].items()
+                         if filename in included]
+            issues.append('{}: &{} inlist {} does not exist'.format(
+                including[0] if including else inlist, section, filename))
+
+        for section, fileDict in dataDict.items():
+            for filename, parameters in fileDict.items():
+                for parameter, value in parameters.items():
+                    issue = self.check_parameter(section, parameter, value)
+                    if issue is not None:
+                        issues.append('{}: &{}: {} {}'.format(
+                            filename, section, parameter, issue))
+
+        starJob = OrderedDict()
+        for parameters in dataDict[sectionStarJob].values():
+            starJob.update(parameters)
+        for flag, parameter in input_file_parameters:
+            if starJob.get(flag) is True and parameter in starJob:
+                path = os.path.join(directory, starJob[parameter])
+                if not os.path.isfile(path):
+                    issues.append('{} {} does not exist'.format(
+                        parameter, starJob[parameter]))
+
+        return issues
+
+    def validate_many(self, directories, inlist='inlist', processes=None):
+        """ Validates many run directories in parallel.
+
+        Every worker process parses the defaults once.
+
+        Args:
+            directories (list): Run directories.
+            inlist (str): Root inlist, relative to each directory.
+            processes (int): Number of worker processes, defaults to
+                             the number of CPUs.
+
+        Returns:
+            OrderedDict: The problems found, keyed by directory.
+                         Valid directories are left out.
+        """
+        directories = list(directories)
+        processes = processes or os.cpu_count()
+        chunksize = max(1, len(directories) // (4 * processes))
+        with ProcessPoolExecutor(processes) as pool:
+            results = pool.map(_validate_worker, directories,
+                               [inlist] * len(directories),
+                               [os.environ[mesa_env]] * len(directories),
+                               chunksize=chunksize)
+            return OrderedDict((directory, issues) for directory, issues
+                               in zip(directories, results) if issues)
+
+    @staticmethod
+    def type_name(value):
+        """ Returns the type of a value, or of the elements of an array,
+        as 'bool', 'str', 'int' or 'float'.
+        """
+        if isinstance(value, np.ndarray):
+            kind = value.dtype.kind
+            return {'b': 'bool', 'U': 'str', 'S': 'str', 'i': 'int',
+                    'u': 'int'}.get(kind, 'float')
+        if isinstance(value, np.generic):
+            value = value.item()
+        if isinstance(value, bool):
+            return 'bool'
+        if isinstance(value, str):
+            return 'str'
+        if isinstance(value, int):
+            return 'int'
+        return 'float'
+
+    def check_parameter(self, section, parameter, value):
+        """ Checks a single parameter.
+
+        Args:
+            section (str): Section the parameter is set in.
+            parameter (str): Name of the parameter.
+            value: Value of the parameter.
+
+        Returns:
+            str: Description of the problem, or None if there is none.
+        """
+        defaultSection, default, defaultValue = \
+            self.envObject.findParameter(parameter)
+        if defaultSection == "":
+            return 'is not a MESA parameter'
+        if defaultSection != section:
+            return 'belongs to the &{} section'.format(defaultSection)
+
+        expected = self.type_name(defaultValue)
+        if expected in ('int', 'float') and self.envObject.isInteger(default):
+            expected = 'int'
+        actual = self.type_name(value)
+        if expected == 'float':
+            matches = actual in ('int', 'float')
+        elif expected == 'int' and actual == 'float':
+            # numbers are read as floats, integers have no fraction
+            matches = bool(np.all(np.mod(value, 1) == 0))
+        else:
+            matches = actual == expected
+        if not matches:
+            return 'has type {}, expected {}'.format(actual, expected)
+
+        if '(' in parameter and default != parameter:
+            name = parameter.split('(')[0].strip()
+            lower, upper = self.envObject.arrayDict[name][2]
+            index = parameter[parameter.index('(') + 1:parameter.rindex(')')]
+            index = index.split(',')[0].split(':')
+            try:
+                first = int(index[0]) if index[0].strip() else lower
+                last = (int(index[-1]) if index[-1].strip()
+                        else upper or first)
+            except ValueError:
+                return 'has an invalid index'
+            if first < lower or (upper is not None and last > upper):
+                return 'is out of the bounds ({}:{})'.format(
+                    lower, '' if upper is None else upper)
+
+        return None
+
+
+_worker_validator = None
+
+
+def _validate_worker(directory, inlist, mesaDir):
+    """ Validates a run directory in a worker process, which parses
+    the defaults once.
+    """
+    global _worker_validator
+    if _worker_validator is None or \
+            _worker_validator.envObject.mesaDir != mesaDir:
+        os.environ[mesa_env] = mesaDir
+        _worker_validator = MesaValidator()
+    return _worker_validator.validate(directory, inlist)
@@ -0,0 +1,256 @@
+# Clones MESA work directories and archives their output
+import os
+import errno
+import fnmatch
+from shutil import copy2, copystat
+from concurrent.futures import ThreadPoolExecutor
+
+from MesaHandler.support import compress_file, compression_suffixes
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# ioctl request number of FICLONE (linux/fs.h), used for reflink copies
+FICLONE = 0x40049409
+
+
+class MesaWorkDir:
+    """ Clones MESA work directories and archives their logs.
+
+    Read-only inputs are shared through hardlinks, everything else is
+    copied with a reflink where the filesystem supports it (btrfs, xfs)
+    and with a regular copy otherwise.
+
+    Attributes:
+        path (str): Path of the work directory.
+        link_patterns (tuple): Glob patterns, relative to the work
+                               directory, of the files that are hardlinked
+                               when cloning.
+        ignore (tuple): Top-level entries that are not cloned.
+    """
+
+    def __init__(self, path='.', link_patterns=('star', 'make/*', '*.mod'),
+                 ignore=('LOGS', 'photos', 'png')):
+        """ __init__ method
+
+        Args:
+            path (str): Path of the work directory.
+            link_patterns (tuple): Files to hardlink when cloning.
+                                   Hardlinked files share their storage
+                                   with the original, so they must never
+                                   be written to in place.
+            ignore (tuple): Top-level entries that are not cloned.
+        """
+        self.path = path
+        self.link_patterns = link_patterns
+        self.ignore = ignore
+
+    def clone(self, dst):
+        """ Clones the work directory.
+
+        Args:
+            dst (str): Destination of the clone. Existing files are
+                       replaced.
+
+        Returns:
+            MesaWorkDir: The cloned work directory.
+        """
+        for root, dirs, files in os.walk(self.path):
+            rel_root = os.path.relpath(root, self.path)
+            if(rel_root == '.'):
+                rel_root = ''
+                dirs[:] = [d for d in dirs if d not in self.ignore]
+                files = [f for f in files if f not in self.ignore]
+
+            os.makedirs(os.path.join(dst, rel_root), exist_ok=True)
+            for name in dirs:
+                src_dir = os.path.join(root, name)
+                if(os.path.islink(src_dir)):
+                    self.copy_link(src_dir, os.path.join(dst, rel_root, name))
+            for name in files:
+                rel_path = os.path.join(rel_root, name)
+                src_file = os.path.join(root, name)
+                dst_file = os.path.join(dst, rel_path)
+                if(os.path.islink(src_file)):
+                    self.copy_link(src_file, dst_file)
+                elif(self.is_linked(rel_path)):
+                    self.link_file(src_file, dst_file)
+                else:
+                    self.copy_file(src_file, dst_file)
+
+        return MesaWorkDir(dst, self.link_patterns, self.ignore)
+
+    def archive_logs(self, dst, mode='copy', log_dir='LOGS', compress=None,
+                     compress_patterns=('*.data',), processes=None):
+        """ Archives the content of the log directory.
+
+        Args:
+            dst (str): Destination directory, which is created if needed.
+            mode (str): 'copy' makes a reflink copy where possible,
+                        'link' hardlinks the files and 'move' renames
+                        them. All modes fall back to a regular copy if
+                        the destination is on another filesystem.
+            log_dir (str): Log directory, relative to the work directory.
+            compress (str): If set to 'gzip' or 'zstd', the files matching
+                            compress_patterns are compressed instead of
+                            copied or linked. With mode 'move' the
+                            originals are removed afterwards.
+            compress_patterns (tuple): Glob patterns of the file names
+                                       to compress.
+            processes (int): Number of files compressed in parallel,
+                             defaults to the number of CPUs.
+
+        Returns:
+            list: Paths of the archived files.
+        """
+        if mode not in ['copy', 'link', 'move']:
+            raise ValueError("Unknown archive mode " + mode +
+                             ", expected 'copy', 'link' or 'move'")
+        if(compress is not None and compress not in compression_suffixes):
+            raise ValueError("Unknown codec " + compress + ", expected " +
+                             "one of " + str(list(compression_suffixes)))
+
+        src = os.path.join(self.path, log_dir)
+        archived = []
+        to_compress = []
+        for root, _, files in os.walk(src):
+            dst_root = os.path.normpath(
+                os.path.join(dst, os.path.relpath(root, src)))
+            os.makedirs(dst_root, exist_ok=True)
+            for name in files:
+                src_file = os.path.join(root, name)
+                dst_file = os.path.join(dst_root, name)
+                if(compress is not None and
+                        any(fnmatch.fnmatch(name, pattern)
+                            for pattern in compress_patterns)):
+                    to_compress.append((src_file, dst_file))
+                    continue
+                elif(mode == 'move'):
+                    self.move_file(src_file, dst_file)
+                elif(mode == 'link'):
+                    self.link_file(src_file, dst_file)
+                else:
+                    self.copy_file(src_file, dst_file)
+                archived.append(dst_file)
+
+        if(to_compress):
+            suffix = compression_suffixes[compress]
+
+            def compress_support(files):
+                src_file, dst_file = files
+                # an uncompressed file would shadow the compressed one
+                self.remove_file(dst_file)
+                compressed = compress_file(src_file, codec=compress,
+                                           dst=dst_file + suffix)
+                if(mode == 'move'):
+                    os.remove(src_file)
+                return compressed
+
+            with ThreadPoolExecutor(processes or os.cpu_count()) as executor:
+                archived.extend(executor.map(compress_support, to_compress))
+
+        return archived
+
+    def is_linked(self, rel_path):
+        """ Checks whether a file is hardlinked when cloning.
+
+        Args:
+            rel_path (str): Path relative to the work directory.
+        """
+        rel_path = rel_path.replace(os.sep, '/')
+        return any(fnmatch.fnmatch(rel_path, pattern)
+                   for pattern in self.link_patterns)
+
+    @staticmethod
+    def reflink(src, dst):
+        """ Makes a copy-on-write clone of a file.
+
+        Args:
+            src (str): File to clone.
+            dst (str): Destination of the clone.
+
+        Returns:
+            bool: Whether the filesystem supports reflinks.
+        """
+        if fcntl is None:
+            return False
+
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            try:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            except OSError:
+                success = False
+            else:
+                success = True
+
+        if(success):
+            copystat(src, dst)
+        else:
+            os.remove(dst)
+        return success
+
+    @staticmethod
+    def copy_file(src, dst):
+        """ Copies a file, using a reflink if possible.
+
+        Args:
+            src (str): File to copy.
+            dst (str): Destination file.
+        """
+        MesaWorkDir.remove_file(dst)
+        if not(MesaWorkDir.reflink(src, dst)):
+            copy2(src, dst)
+
+    @staticmethod
+    def link_file(src, dst):
+        """ Hardlinks a file, falling back to a copy.
+
+        Args:
+            src (str): File to link.
+            dst (str): Destination file.
+        """
+        MesaWorkDir.remove_file(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            MesaWorkDir.copy_file(src, dst)
+
+    @staticmethod
+    def move_file(src, dst):
+        """ Renames a file, falling back to a copy across filesystems.
+
+        Args:
+            src (str): File to move.
+            dst (str): Destination file.
+        """
+        try:
+            os.replace(src, dst)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            MesaWorkDir.copy_file(src, dst)
+            os.remove(src)
+
+    @staticmethod
+    def copy_link(src, dst):
+        """ Recreates a symbolic link.
+
+        Args:
+            src (str): Link to copy.
+            dst (str): Destination link.
+        """
+        if(os.path.lexists(dst)):
+            os.remove(dst)
+        os.symlink(os.readlink(src), dst)
+
+    @staticmethod
+    def remove_file(file_name):
+        """ Safely removes a file.
+
+        Args:
+            file_name (str): File to delete.
+        """
+        if(os.path.lexists(file_name)):
+            os.remove(file_name)
@@ -1,6 +1,15 @@
 from MesaHandler.MesaAccess import *
 from MesaHandler.MesaInlist import *
 from MesaHandler.MesaRunner import *
+from MesaHandler.MesaWorkDir import *
+from MesaHandler.MesaLogReader import *
+from MesaHandler.MesaValidator import *
+from MesaHandler.MesaAggregator import *
+from MesaHandler.MesaMonitor import *
+from MesaHandler.MesaRetention import *
+from MesaHandler.MesaRuntimeModel import *
+from MesaHandler.MesaScheduler import *
+from MesaHandler.MesaCatalog import *
 from MesaHandler.MesaFileHandler import *
 from MesaHandler.support.constants import *
 from MesaHandler.MesaDebugger import *
@@ -2,3 +2,4 @@ from .regex_def import *
 from .definitions import *
 from .supportFunctions import *
 from .constants import *
+from .compression import *
@@ -0,0 +1,98 @@
+""" This module handles the compressed archiving of MESA output files. """
+import io
+import os
+import gzip
+from shutil import copyfileobj, copystat
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+compression_suffixes = {"gzip": ".gz", "zstd": ".zst"}
+
+# chunk size used when streaming files through a compressor
+chunk_size = 1 << 20
+
+
+def find_log(file_name):
+    """ Finds a file, or a compressed version of it.
+
+    Args:
+        file_name (str): Name of the uncompressed file.
+
+    Returns:
+        str: Name of the existing file.
+    """
+    if os.path.exists(file_name):
+        return file_name
+    for suffix in compression_suffixes.values():
+        if os.path.exists(file_name + suffix):
+            return file_name + suffix
+    raise FileNotFoundError("Neither " + file_name +
+                            " nor a compressed version of it exists")
+
+
+def open_log(file_name, mode="rt"):
+    """ Opens a file for reading, decompressing it on the fly.
+
+    Args:
+        file_name (str): Name of the file, with or without
+                         the compression suffix.
+        mode (str): 'rt' for text or 'rb' for binary access.
+
+    Returns:
+        A file object.
+    """
+    file_name = find_log(file_name)
+    if file_name.endswith(compression_suffixes["gzip"]):
+        return gzip.open(file_name, mode)
+    elif file_name.endswith(compression_suffixes["zstd"]):
+        if zstandard is None:
+            raise ImportError("Reading " + file_name +
+                              " requires the zstandard package")
+        stream = zstandard.ZstdDecompressor().stream_reader(
+            open(file_name, "rb"), closefd=True)
+        if mode == "rb":
+            return stream
+        return io.TextIOWrapper(stream)
+    return open(file_name, mode)
+
+
+def compress_file(src, dst=None, codec="gzip", level=None):
+    """ Compresses a file by streaming it through the compressor.
+
+    Args:
+        src (str): File to compress.
+        dst (str): Compressed file, defaults to src plus the suffix
+                   of the codec.
+        codec (str): 'gzip' or 'zstd'.
+        level (int): Compression level, defaults to the codec's default.
+
+    Returns:
+        str: Name of the compressed file.
+    """
+    if codec not in compression_suffixes:
+        raise ValueError("Unknown codec " + codec +
+                         ", expected one of " +
+                         str(list(compression_suffixes.keys())))
+    if dst is None:
+        dst = src + compression_suffixes[codec]
+
+    with open(src, "rb") as fsrc:
+        if codec == "gzip":
+            level = 6 if level is None else level
+            with gzip.open(dst, "wb", compresslevel=level) as fdst:
+                copyfileobj(fsrc, fdst, chunk_size)
+        else:
+            if zstandard is None:
+                raise ImportError("zstd compression requires "
+                                  "the zstandard package")
+            level = 3 if level is None else level
+            compressor = zstandard.ZstdCompressor(level=level)
+            with open(dst, "wb") as fdst:
+                compressor.copy_stream(fsrc, fdst, read_size=chunk_size,
+                                       write_size=chunk_size)
+    copystat(src, dst)
+
+    return dst
@@ -5,12 +5,39 @@ sectionPgStar = "pgstar"
 mesa_env = "MESA_DIR"
 
 sections = [sectionStarJob, sectionControl, sectionPgStar]
-external_file_parameters = ["extra_star_job_inlist1_name",
-                            "extra_controls_inlist1_name",
-                            "extra_pgstar_inlist1_name"]
+# MESA reads up to five extra inlists per section
+extra_inlist_numbers = range(1, 6)
+external_file_parameters = ["extra_" + section + "_inlist" + str(n) + "_name"
+                            for n in extra_inlist_numbers
+                            for section in sections]
+external_file_flags = ["read_extra_" + section + "_inlist" + str(n)
+                       for n in extra_inlist_numbers
+                       for section in sections]
 defaults_file_names = ["star_job.defaults", "controls.defaults",
                        "pgstar.defaults"]
 
+# star_job flags and the parameters naming the files MESA then reads
+input_file_parameters = [
+    ("load_saved_model", "saved_model_name"),
+    ("load_saved_model", "load_model_filename"),
+    ("relax_initial_composition", "relax_composition_filename"),
+    ("relax_initial_angular_momentum", "relax_angular_momentum_filename"),
+    ("relax_initial_entropy", "relax_entropy_filename"),
+]
+
+# values of the array dimensions used in the defaults (star_def.inc)
+array_dimensions = {"num_x_ctrls": 100}
+
+# Fortran declarations of the controls, relative to MESA_DIR. They tell
+# integer from real parameters, which the defaults files do not always do
+declaration_file_patterns = ["star_data/private/*controls*.inc",
+                             "star_data/public/*controls*.inc",
+                             "star/private/*controls*.inc",
+                             "star/public/*controls*.inc"]
+
+# MesaRunner appends the outcome of every run to this file
+run_record_name = "mesa_runs.jsonl"
+
 defaultsFileDict = dict(zip(sections, defaults_file_names))
 
 defaultsPath = "/star/defaults/"
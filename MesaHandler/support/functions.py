@@ -10,7 +10,7 @@ def get_latest_log():
         Returns:
             latest_log (str): filename of most recent profile
     """
-    ma = MesaAccess()
+    ma = MesaAccess.cached()
     try:
         log_prefix = ma["profile_data_prefix"]
     except KeyError:
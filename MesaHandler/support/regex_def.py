@@ -1,8 +1,10 @@
 # Matches all sections in an inlist file. First Group is name of section, second is content
-regex_sections = r"\&(\w+\_?\w+)([\w_\s\.\'\=\!\:\(\)\/\>\<\-\,]+)\/"
+regex_sections = r"\&(\w+\_?\w+)([\w_\s\.\'\=\!\:\(\)\/\>\<\-\+\*\,]+)\/"
 # Matches all parameters from a content. First Group is name of variable, second is content
-regex_read_parameter = r"^\s+([\w_\d\(\):]+)\s*=\s*([-\.\w_\d']+)"
+regex_read_parameter = r"^\s+([\w_\d\(\):]+)\s*=\s*([-+\.\w_\d'*]+(?:[ \t]*,[ \t]*[-+\.\w_\d'*]+)*)"
 # Matches floatingpoint values. First one is pre floatingpoint, second one is power to 10
 regex_floatingValue = r"([-+]? (?: (?: \d* \. \d+ ) | (?: \d+ \.? ) )(?: [DdEe] [+-]? \d+ ) ?)"
+# Matches repeated values of an array, e.g. 3*0.5. First group is the count, second is the value
+regex_repeatedValue = r"^(\d+)\*(.+)$"
 # Matches a whole section and allows for it to insert something you would want
 regex = r'[\w_\s\.\'\=\!\(\)\/\>\<\-\,]+)(\/)'
@@ -0,0 +1,11 @@
+import os
+import shutil
+
+inlistNames = ["inlist", "inlist_project", "inlist_pgstar"]
+
+
+def copyInlists(path):
+    """ Copies the test inlist chain into a run directory. """
+    os.makedirs(path, exist_ok=True)
+    for name in inlistNames:
+        shutil.copy2(os.path.join("tests", name), os.path.join(path, name))
@@ -0,0 +1,63 @@
+import os
+import json
+
+import numpy as np
+
+from MesaHandler import MesaAggregator
+from MesaHandler.support import *
+from tests.helpers import copyInlists
+
+history = "\n".join([
+    "  1",
+    "  version_number",
+    '  "r15140"',
+    "",
+    "  1  2  3",
+    "  model_number  star_age  log_L",
+    "  1  1.0E+05  0.5",
+    "  {}  {}  1.5",
+    ""])
+
+
+def makeRun(path, model_number, star_age, record=None):
+    os.makedirs(os.path.join(path, "LOGS"))
+    copyInlists(path)
+    with open(os.path.join(path, "LOGS", "history.data"), "w") as f:
+        f.write(history.format(model_number, star_age))
+    if record is not None:
+        with open(os.path.join(path, run_record_name), "w") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def testAggregate(tmp_path):
+    makeRun(str(tmp_path / "grid" / "run1"), 120, "4.6E+09",
+            {"convergence": True, "run_time": 60.5})
+    makeRun(str(tmp_path / "grid" / "run2"), 80, "1.0E+09")
+    os.makedirs(str(tmp_path / "grid" / "broken"))
+    with open(str(tmp_path / "grid" / "broken" / "inlist"), "w") as f:
+        f.write("&star_job\n/\n")
+
+    runs = MesaAggregator.find_runs(str(tmp_path / "grid"))
+    assert [os.path.basename(run) for run in runs] == \
+        ["broken", "run1", "run2"]
+
+    aggregator = MesaAggregator(history_columns=["model_number", "star_age"],
+                                parameters=["initial_mass", "max_age"],
+                                processes=2)
+    table = aggregator.aggregate(runs, str(tmp_path / "grid.npz"))
+    assert list(table.keys()) == ["directory", "status", "model_number",
+                                  "star_age", "convergence", "run_time",
+                                  "initial_mass", "max_age"]
+    assert list(table["model_number"][1:]) == [120, 80]
+    assert table["star_age"][1] == 4.6e9
+    assert table["convergence"][1] == 1 and np.isnan(table["convergence"][2])
+    assert table["run_time"][1] == 60.5
+    assert list(table["initial_mass"][1:]) == [10, 10]
+    assert np.isnan(table["initial_mass"][0])
+    assert table["status"][0] != "ok"
+
+    stored = np.load(str(tmp_path / "grid.npz"))
+    assert list(stored["model_number"][1:]) == [120, 80]
+    aggregator.write(table, str(tmp_path / "grid.csv"))
+    with open(str(tmp_path / "grid.csv")) as f:
+        assert f.readline().startswith("directory,status,model_number")
@@ -0,0 +1,60 @@
+import os
+import json
+import shutil
+
+from MesaHandler import MesaCatalog
+from MesaHandler.support import *
+from tests.helpers import copyInlists
+
+
+def makeRun(path, initial_mass, record=None):
+    copyInlists(path)
+    setMass(path, initial_mass)
+    if record is not None:
+        with open(os.path.join(path, run_record_name), "w") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+def setMass(path, initial_mass):
+    file_name = os.path.join(path, "inlist_project")
+    with open(file_name) as f:
+        content = f.read()
+    with open(file_name, "w") as f:
+        f.write(content.replace("initial_mass = 10",
+                                "initial_mass = {}".format(initial_mass)))
+
+
+def testCatalog(tmp_path):
+    grid = str(tmp_path / "grid")
+    makeRun(os.path.join(grid, "m1"), 1.0,
+            {"convergence": True, "run_time": 60.0})
+    makeRun(os.path.join(grid, "m1.5"), 1.5)
+    makeRun(os.path.join(grid, "m3"), 3.0,
+            {"convergence": False, "run_time": 10.0})
+
+    catalog = MesaCatalog(str(tmp_path / "catalog.sqlite"), processes=2)
+    assert len(catalog.scan(grid)) == 3
+    assert catalog.scan(grid) == []
+
+    runs = catalog.query({"initial_mass": (1, 2)})
+    assert [os.path.basename(r["directory"]) for r in runs] == ["m1", "m1.5"]
+    assert runs[0]["convergence"] == 1
+    assert runs[0]["run_time"] == 60.0
+    assert len(catalog.query({"initial_mass": (2, None)})) == 1
+    assert len(catalog.query({"initial_mass": (1, 2)}, convergence=True)) == 1
+    assert len(catalog.query({"save_model_filename": "zams.mod"})) == 0
+    assert len(catalog.query(
+        {"save_model_filename": "15M_at_TAMS.mod"})) == 3
+    parameters = catalog.parameters(os.path.join(grid, "m3"))
+    assert parameters["initial_mass"] == 3.0
+    assert len(catalog.query({"pgstar_flag": parameters["pgstar_flag"]})) == 3
+
+    setMass(os.path.join(grid, "m3"), 3.0)
+    os.utime(os.path.join(grid, "m3", "inlist_project"), (0, 0))
+    shutil.rmtree(os.path.join(grid, "m1.5"))
+    assert catalog.scan(grid) == [os.path.join(grid, "m3")]
+    assert len(catalog.query()) == 2
+    catalog.close()
+
+    catalog = MesaCatalog(str(tmp_path / "catalog.sqlite"))
+    assert len(catalog.query({"initial_mass": 1.0})) == 1
@@ -1,10 +1,15 @@
 import pytest
+import numpy as np
 from typing import Tuple,List
 
-from MesaHandler import MesaFileAccess, MesaInlist
+from MesaHandler import MesaFileAccess, MesaInlist, MesaAccess
+from MesaHandler.MesaFileHandler import IMesaInterface
 from MesaHandler.support import *
+from tests.helpers import copyInlists
 
+import glob
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 
 
 testWritePath = "tests/playground/"
@@ -111,3 +116,128 @@ def testWriteFile(defaultSetup: MesaFileAccess,value:Tuple[str,str]):
     assert os.path.exists(testWritePath+value[0])
     with open(testWritePath+value[0]) as f:
         assert value[1] == f.read()
+
+
+def testArrays(defaultSetup: MesaFileAccess):
+    ma = MesaAccess()
+    values = np.array([0.5, 0.5, 0.5, 1e-5, 0.123456789012345])
+    ma['x_ctrl'][1:5] = values
+    with open("inlist_project") as f:
+        assert "x_ctrl(1:5) = 3*0.5, 1d-5, 0.123456789012345" in f.read()
+
+    ma = MesaAccess()
+    assert np.array_equal(ma['x_ctrl'][1:5], values)
+    assert ma['x_ctrl'][6] == 0
+    ma['x_ctrl'][4] = 2.5
+    ma['x_ctrl'][5:6] = 1.0
+    assert list(MesaAccess()['x_ctrl'][3:7]) == [0.5, 2.5, 1.0, 1.0, 0]
+
+    ma['xa_central_lower_limit'] = [1e-3, 1e-4]
+    ma = MesaAccess()
+    assert 'xa_central_lower_limit(1)' not in ma.keys()
+    assert list(ma['xa_central_lower_limit'][1:2]) == [1e-3, 1e-4]
+    assert list(ma['xa_central_lower_limit_species'][1:2]) == ['h1', '']
+
+    ma['x_integer_ctrl'][1:3] = [1, 2, 3]
+    ma = MesaAccess()
+    assert ma['x_integer_ctrl'][1:3].dtype.kind == 'i'
+    ma['x_integer_ctrl'][2] = 5
+    ma['x_integer_ctrl'][1:4] = ma['x_integer_ctrl'][1:4]
+    with open("inlist_project") as f:
+        assert "x_integer_ctrl(1:4) = 1, 5, 3, 0" in f.read()
+    assert list(MesaAccess()['x_integer_ctrl'][1:4]) == [1, 5, 3, 0]
+
+    with pytest.raises(IndexError):
+        ma['x_ctrl'][99:101] = [1.0, 2.0, 3.0]
+    with pytest.raises(ValueError):
+        ma['x_ctrl'][1:3] = [1.0]
+    with pytest.raises(TypeError):
+        ma['x_ctrl'][1:2] = [True, False]
+    with pytest.raises(ValueError):
+        ma['x_ctrl'][1:10:2] = [1.0, 2.0, 3.0, 4.0, 5.0]
+    with pytest.raises(ValueError):
+        ma['x_ctrl'][1:10:2]
+    assert list(ma['x_ctrl'][1:2:1]) == list(ma['x_ctrl'][1:2])
+
+
+def testConcurrentEdits(defaultSetup: MesaFileAccess):
+    other = MesaFileAccess()
+    defaultSetup["initial_mass"] = 3
+    assert other["controls"]["inlist_project"]["initial_mass"] != 3
+    other["max_age"] = 1e9
+    assert other["controls"]["inlist_project"]["initial_mass"] == 3
+    assert MesaFileAccess()["controls"]["inlist_project"]["max_age"] == 1e9
+
+    with open("inlist_project") as f:
+        content = f.read()
+    with open("inlist_project", "w") as f:
+        f.write(content.replace("max_age = 1d9", "max_age = 2d9"))
+    assert defaultSetup.refresh() == ["inlist_project"]
+    assert defaultSetup["controls"]["inlist_project"]["max_age"] == 2e9
+
+    def edit(i):
+        return MesaInlist.edit_file("inlist_project",
+                                    {"x_ctrl({})".format(i): float(i)},
+                                    {"x_ctrl({})".format(i): "controls"})
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(edit, range(1, 17)))
+    parameters = MesaFileAccess()["controls"]["inlist_project"]
+    assert all(parameters["x_ctrl({})".format(i)] == i for i in range(1, 17))
+    assert not glob.glob(".inlist*.lock")
+
+
+def testCachedAccess(defaultSetup: MesaFileAccess):
+    MesaAccess.invalidate()
+    ma = MesaAccess.cached()
+    assert MesaAccess.cached() is ma
+    ma["initial_mass"] = 4
+    assert MesaAccess.cached() is ma
+
+    defaultSetup["initial_mass"] = 6
+    updated = MesaAccess.cached()
+    assert updated is not ma
+    assert updated["initial_mass"] == 6
+    assert updated.mesaFileAccess.envObject is ma.mesaFileAccess.envObject
+
+    shutil.copy2("inlist_pgstar", "inlist_pgstar.bak")
+    os.remove("inlist_pgstar")
+    with pytest.raises(FileNotFoundError):
+        MesaAccess.cached()
+    os.replace("inlist_pgstar.bak", "inlist_pgstar")
+    assert MesaAccess.cached()["initial_mass"] == 6
+
+
+def testCachedAccessFromOtherDirectory(tmp_path, monkeypatch):
+    MesaAccess.invalidate()
+    copyInlists(str(tmp_path / "a" / "run"))
+    copyInlists(str(tmp_path / "b" / "run"))
+    monkeypatch.chdir(str(tmp_path / "a"))
+    ma = MesaAccess.cached("run")
+    monkeypatch.chdir(str(tmp_path / "b"))
+    assert MesaAccess.cached("../a/run") is ma
+    ma["initial_mass"] = 4
+
+    assert MesaAccess(str(tmp_path / "a" / "run"))["initial_mass"] == 4
+    assert MesaAccess("run")["initial_mass"] == 10
+
+
+def testSymlinkedInclude(tmp_path):
+    copyInlists(str(tmp_path / "shared"))
+    copyInlists(str(tmp_path / "run"))
+    os.remove(str(tmp_path / "run" / "inlist_project"))
+    os.symlink(os.path.join("..", "shared", "inlist_project"),
+               str(tmp_path / "run" / "inlist_project"))
+    MesaAccess(str(tmp_path / "run"))["initial_mass"] = 4
+
+    assert os.path.islink(str(tmp_path / "run" / "inlist_project"))
+    assert MesaAccess(str(tmp_path / "shared"))["initial_mass"] == 4
+
+
+def testNewFileMode(tmp_path):
+    umask = os.umask(0o022)
+    try:
+        fileName = str(tmp_path / "inlist_new")
+        IMesaInterface().writeFile(fileName, "&controls\n/\n")
+    finally:
+        os.umask(umask)
+    assert os.stat(fileName).st_mode & 0o777 == 0o644
@@ -0,0 +1,30 @@
+import shutil
+
+from MesaHandler import MesaInlist, MesaInlistResolver
+from MesaHandler.support import *
+
+
+def testBulkEdit(tmp_path):
+    for name in ["inlist_1_create", "inlist_2_evolve"]:
+        shutil.copy2("tests/inlist_project", str(tmp_path / name))
+    shutil.copy2("tests/inlist_pgstar", str(tmp_path / "inlist_pgstar"))
+
+    with cd(str(tmp_path)):
+        mi = MesaInlist()
+        changes = {"initial_mass": 2.5, "mixing_length_alpha": 2,
+                   "max_model_number": 500, "HR_win_flag": False}
+        summary = mi.bulk_edit(changes, pattern="inlist_[0-9]*")
+
+        assert sorted(summary.keys()) == ["inlist_1_create", "inlist_2_evolve"]
+        for changed in summary.values():
+            assert changed["initial_mass"] == (10, 2.5)
+            assert changed["max_model_number"] == (None, 500)
+            assert "mixing_length_alpha" not in changed
+            assert "HR_win_flag" not in changed
+
+        dataDict = MesaInlistResolver().resolve("inlist_2_evolve")
+        assert dataDict["controls"]["inlist_2_evolve"]["initial_mass"] == 2.5
+        assert dataDict["controls"]["inlist_2_evolve"]["max_model_number"] \
+            == 500
+        assert mi.bulk_edit(changes, inlists=["inlist_1_create"]) == \
+            {"inlist_1_create": {}}
@@ -0,0 +1,80 @@
+import os
+import pytest
+
+from MesaHandler import MesaInlistResolver
+
+
+def writeInlist(path, section, lines):
+    path.write_text("&" + section + "\n" +
+                    "".join("    " + line + "\n" for line in lines) +
+                    "/ ! end of " + section + " namelist\n")
+
+
+@pytest.fixture(scope="function")
+def chainDir(tmp_path):
+    writeInlist(tmp_path / "inlist", "controls", [
+        "read_extra_controls_inlist1 = .true.",
+        "extra_controls_inlist1_name = 'inlist_a'",
+        "read_extra_controls_inlist(3) = .true.",
+        "extra_controls_inlist_name(3) = 'inlist_c'",
+        "read_extra_controls_inlist2 = .false.",
+        "extra_controls_inlist2_name = 'inlist_missing'",
+    ])
+    writeInlist(tmp_path / "inlist_a", "controls", [
+        "initial_mass = 2",
+        "read_extra_controls_inlist5 = .true.",
+        "extra_controls_inlist5_name = 'inlist_b'",
+    ])
+    writeInlist(tmp_path / "inlist_b", "controls", ["initial_z = 0.02"])
+    writeInlist(tmp_path / "inlist_c", "controls", ["max_age = 1d9"])
+    return tmp_path
+
+
+def testResolve(chainDir):
+    resolver = MesaInlistResolver(str(chainDir))
+    dataDict = resolver.resolve()
+    assert list(dataDict["controls"].keys()) == \
+        ["inlist", "inlist_a", "inlist_b", "inlist_c"]
+    assert dataDict["controls"]["inlist_b"]["initial_z"] == 0.02
+    assert resolver.includes["controls"]["inlist"] == ["inlist_a", "inlist_c"]
+    assert dataDict["star_job"] == {}
+
+
+def testCache(chainDir, monkeypatch):
+    MesaInlistResolver(str(chainDir)).resolve()
+
+    reads = []
+    readFile = MesaInlistResolver.readFile
+    monkeypatch.setattr(MesaInlistResolver, "readFile",
+                        lambda self, name: reads.append(name) or
+                        readFile(self, name))
+    MesaInlistResolver(str(chainDir)).resolve()
+    assert reads == []
+
+    writeInlist(chainDir / "inlist_c", "controls", ["max_age = 2d9"])
+    dataDict = MesaInlistResolver(str(chainDir)).resolve()
+    assert reads == [str(chainDir / "inlist_c")]
+    assert dataDict["controls"]["inlist_c"]["max_age"] == 2e9
+
+
+def testReplacedFile(chainDir, monkeypatch):
+    # a file replaced by a copy of the same size, where timestamps
+    # are too coarse to tell them apart
+    stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path, *args, **kwargs:
+                        os.stat_result(stat(path, *args, **kwargs)[:7] +
+                                       (0, 0, 0)))
+    MesaInlistResolver(str(chainDir)).resolve()
+    writeInlist(chainDir / "inlist_copy", "controls", ["max_age = 3d9"])
+    os.replace(str(chainDir / "inlist_copy"), str(chainDir / "inlist_c"))
+    dataDict = MesaInlistResolver(str(chainDir)).resolve()
+    assert dataDict["controls"]["inlist_c"]["max_age"] == 3e9
+
+
+def testCycle(chainDir):
+    writeInlist(chainDir / "inlist_b", "controls", [
+        "read_extra_controls_inlist1 = .true.",
+        "extra_controls_inlist1_name = 'inlist_a'",
+    ])
+    with pytest.raises(ValueError):
+        MesaInlistResolver(str(chainDir)).resolve()
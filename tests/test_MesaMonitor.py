@@ -0,0 +1,73 @@
+import os
+from urllib.request import urlopen
+
+from MesaHandler import MesaMonitor, MesaHistoryTail
+
+preamble = "\n".join([
+    "  1",
+    "  version_number",
+    '  "r15140"',
+    "",
+    "  1  2  3  4",
+    "  model_number  star_age  log_Teff  log_L",
+    ""])
+
+
+def testHistoryTail(tmp_path):
+    file_name = str(tmp_path / "history.data")
+    tail = MesaHistoryTail(file_name, ["model_number", "log_L"], max_points=4)
+    assert tail.update() == 0
+
+    with open(file_name, "w") as f:
+        f.write(preamble)
+        f.write("  1  1.0  3.7  0.0\n  2  2.0  3.7  0.1\n  3  3.0")
+    assert tail.update() == 2
+    assert list(tail.data["model_number"]) == [1, 2]
+    assert "star_age" not in tail.data
+
+    with open(file_name, "a") as f:
+        f.write("  3.7  0.2\n")
+        for i in range(4, 11):
+            f.write("  {}  {}.0  3.7  0.{}\n".format(i, i, i))
+    assert tail.update() == 8
+    assert len(tail.data["model_number"]) <= 4
+    assert tail.data["model_number"][0] == 1
+    assert tail.series("model_number")[-1] == 10
+
+
+def testConstantColumn(tmp_path):
+    file_name = str(tmp_path / "history.data")
+    tail = MesaHistoryTail(file_name, ["model_number", "log_Teff"],
+                           max_points=4)
+    with open(file_name, "w") as f:
+        f.write(preamble)
+    for i in range(1, 12):
+        with open(file_name, "a") as f:
+            f.write("  {}  {}.0  3.7  0.0\n".format(i, i))
+        tail.update()
+        assert len(tail.series("model_number")) == \
+            len(tail.series("log_Teff"))
+        assert tail.series("model_number")[-1] == i
+
+
+def testMonitor(tmp_path):
+    run_dir = str(tmp_path / "run")
+    os.makedirs(os.path.join(run_dir, "LOGS"))
+    with open(os.path.join(run_dir, "LOGS", "history.data"), "w") as f:
+        f.write(preamble)
+        f.write("  1  1.0  3.7  0.0\n  2  2.0  3.71  0.1\n")
+
+    output_dir = str(tmp_path / "monitor")
+    monitor = MesaMonitor([run_dir], output_dir=output_dir, interval=0)
+    monitor.update()
+    assert os.path.isfile(os.path.join(output_dir,
+                                       monitor.image_name(run_dir)))
+    with open(os.path.join(output_dir, "index.html")) as f:
+        assert run_dir in f.read()
+
+    monitor.serve(0)
+    host, port = monitor._server.server_address[:2]
+    assert host == "127.0.0.1"
+    with urlopen("http://127.0.0.1:{}/index.html".format(port)) as f:
+        assert run_dir in f.read().decode()
+    monitor.stop()
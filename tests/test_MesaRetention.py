@@ -0,0 +1,68 @@
+import os
+import threading
+
+from MesaHandler import MesaRetention
+
+
+def makeRun(run_dir):
+    os.makedirs(os.path.join(run_dir, "photos"))
+    os.makedirs(os.path.join(run_dir, "LOGS"))
+    for i, model in enumerate([100, 150, 200, 250, 300]):
+        name = os.path.join(run_dir, "photos", "x{}".format(model))
+        with open(name, "w") as f:
+            f.write("p" * 100)
+        os.utime(name, (i, i))
+    with open(os.path.join(run_dir, "LOGS", "profiles.index"), "w") as f:
+        f.write("3 models.    lines hold model number, priority, "
+                "and profile number.\n"
+                "  100  2  1\n  150  1  2\n  200  1  3\n")
+    for n in range(1, 4):
+        with open(os.path.join(run_dir, "LOGS",
+                               "profile{}.data".format(n)), "w") as f:
+            f.write("d" * 1000)
+    with open(os.path.join(run_dir, "LOGS", "profile2.data.FGONG"),
+              "w") as f:
+        f.write("f")
+
+
+def testPolicies(tmp_path):
+    run_dir = str(tmp_path / "run")
+    makeRun(run_dir)
+
+    retention = MesaRetention([run_dir], photo_stride=100, keep_latest=1,
+                              min_priority=2)
+    deleted = retention.apply()
+    assert sorted(os.listdir(os.path.join(run_dir, "photos"))) == \
+        ["x100", "x200", "x300"]
+    assert sorted(os.listdir(os.path.join(run_dir, "LOGS"))) == \
+        ["profile1.data", "profile3.data", "profiles.index"]
+    assert len(deleted) == 4
+    with open(os.path.join(run_dir, "LOGS", "profiles.index")) as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("2 models.")
+    assert lines[1:] == ["  100  2  1", "  200  1  3"]
+    assert retention.apply() == []
+
+
+def testBudget(tmp_path):
+    run_dir = str(tmp_path / "run")
+    makeRun(run_dir)
+
+    retention = MesaRetention([run_dir], keep_latest=2,
+                              max_bytes_per_run=2500)
+    retention.apply()
+    assert sorted(os.listdir(os.path.join(run_dir, "photos"))) == \
+        ["x250", "x300"]
+    remaining = sorted(os.listdir(os.path.join(run_dir, "LOGS")))
+    assert "profile3.data" in remaining
+    assert "profile1.data" in remaining
+    assert "profile2.data" not in remaining
+    retention.stop()
+    assert retention._deleter is None
+
+    threads = threading.active_count()
+    for _ in range(3):
+        retention = MesaRetention([run_dir])
+        retention.apply()
+        retention.stop()
+    assert threading.active_count() == threads
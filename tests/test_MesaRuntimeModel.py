@@ -0,0 +1,28 @@
+import json
+import pytest
+
+from MesaHandler import MesaRuntimeModel
+from MesaHandler.support import *
+
+
+def testPredict(tmp_path):
+    model = MesaRuntimeModel(neighbours=2)
+    assert model.predict({"initial_mass": 1.0}) is None
+
+    with open(str(tmp_path / run_record_name), "w") as f:
+        for mass, run_time, convergence in [(1.0, 100, True),
+                                            (2.0, 200, True),
+                                            (4.0, 400, True),
+                                            (8.0, 800, True),
+                                            (3.0, 5, False)]:
+            f.write(json.dumps({
+                "convergence": convergence, "run_time": run_time,
+                "parameters": {"initial_mass": mass, "initial_z": 0.02,
+                               "pgstar_flag": False}}) + "\n")
+    assert model.load([str(tmp_path), str(tmp_path / "missing")]) == 4
+
+    assert model.predict({"initial_mass": 8.0}) == pytest.approx(800, 1e-3)
+    assert 200 < model.predict({"initial_mass": 3.0}) < 400
+    assert model.predict({"initial_mass": 20.0}) > model.predict(
+        {"initial_mass": 5.0})
+    assert model.predict({}) > 0
@@ -0,0 +1,138 @@
+import os
+import stat
+import pytest
+
+from MesaHandler import MesaScheduler, MesaRuntimeModel
+
+fake_star = """#!/usr/bin/env python3
+import os, re
+content = open('inlist').read()
+load = re.search(r"load_model_filename = '(.*)'", content)
+if load and not os.path.isfile(load.group(1)):
+    raise SystemExit(1)
+if 'fail' not in content:
+    save = re.search(r"save_model_filename = '(.*)'", content).group(1)
+    open(save, 'w').close()
+"""
+
+stage = """&star_job
+    save_model_when_terminate = .true.
+    save_model_filename = '{save}'
+    {load}
+    pgstar_flag = .false.
+/
+&controls
+    filename_for_profile_when_terminate = 'final_profile.data'
+    max_age = 1d9
+    {fail}
+/
+&pgstar
+/
+"""
+
+
+def makeStage(work_dir, name, save, load=None, fail=False):
+    with open(os.path.join(work_dir, name), "w") as f:
+        f.write(stage.format(
+            save=save, fail="! fail" if fail else "",
+            load="load_saved_model = .true.\n    load_model_filename = "
+                 "'{}'".format(load) if load else ""))
+
+
+def makeModel(tmp_path, name, fail=False):
+    work_dir = str(tmp_path / name)
+    os.makedirs(work_dir)
+    with open(os.path.join(work_dir, "star"), "w") as f:
+        f.write(fake_star)
+    os.chmod(os.path.join(work_dir, "star"), stat.S_IRWXU)
+    makeStage(work_dir, "inlist_pre_ms", "pre_ms.mod")
+    makeStage(work_dir, "inlist_zams", "zams.mod", load="pre_ms.mod",
+              fail=fail)
+    makeStage(work_dir, "inlist_main", "final.mod", load="zams.mod")
+    return work_dir
+
+
+def testDependencies(tmp_path):
+    work_dir = makeModel(tmp_path, "m1")
+    scheduler = MesaScheduler()
+    main = scheduler.add("inlist_main", work_dir)
+    pre_ms = scheduler.add("inlist_pre_ms", work_dir)
+    zams = scheduler.add("inlist_zams", work_dir)
+    dependencies = scheduler.dependencies()
+    assert dependencies[main] == {zams}
+    assert dependencies[zams] == {pre_ms}
+    assert dependencies[pre_ms] == set()
+
+    scheduler.add("inlist_pre_ms", work_dir, depends_on=[main], name="loop")
+    makeStage(work_dir, "inlist_pre_ms", "pre_ms.mod", load="final.mod")
+    with pytest.raises(ValueError):
+        scheduler.dependencies()
+    with pytest.raises(KeyError):
+        scheduler.add("inlist_main", work_dir, depends_on=["unknown"])
+
+
+def testRun(tmp_path, capsys):
+    scheduler = MesaScheduler(processes=2, runtime_model=MesaRuntimeModel(),
+                              update_interval=0)
+    for name, fail in [("m1", False), ("m2", True), ("m3", False)]:
+        work_dir = makeModel(tmp_path, name, fail)
+        for inlist in ["inlist_main", "inlist_zams", "inlist_pre_ms"]:
+            scheduler.add(inlist, work_dir)
+
+    status = scheduler.run()
+    assert os.path.isfile(str(tmp_path / "m1" / "final.mod"))
+    assert os.path.isfile(str(tmp_path / "m3" / "final.mod"))
+    assert status[os.path.join(str(tmp_path), "m2", "inlist_zams")] == \
+        "failed"
+    assert status[os.path.join(str(tmp_path), "m2", "inlist_main")] == \
+        "skipped"
+    assert list(status.values()).count("finished") == 7
+    assert list(scheduler.errors.keys()) == \
+        [os.path.join(str(tmp_path), "m2", "inlist_zams")]
+    assert "stages done" in capsys.readouterr().out
+
+
+def testRelativeWorkDirs(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    scheduler = MesaScheduler(processes=1)
+    for name in ["m1", "m2"]:
+        makeModel(tmp_path, name)
+        scheduler.add_model(name, ["inlist_pre_ms", "inlist_zams",
+                                   "inlist_main"])
+    missing = scheduler.add("inlist_main", "missing")
+
+    status = scheduler.run()
+    assert os.path.isfile(str(tmp_path / "m1" / "final.mod"))
+    assert os.path.isfile(str(tmp_path / "m2" / "final.mod"))
+    assert list(status.values()).count("finished") == 6
+    assert status[missing] == "failed"
+    assert "FileNotFoundError" in scheduler.errors[missing]
+
+
+def testLongestFirst(tmp_path):
+    runtime_model = MesaRuntimeModel(parameters=["initial_mass"],
+                                     neighbours=1)
+    for mass in [1.0, 2.0, 4.0]:
+        runtime_model.add({"initial_mass": mass}, 100 * mass)
+
+    scheduler = MesaScheduler(processes=2, runtime_model=runtime_model)
+    for mass in [1.0, 4.0, 2.0]:
+        work_dir = str(tmp_path / "m{}".format(mass))
+        os.makedirs(work_dir)
+        with open(os.path.join(work_dir, "inlist_main"), "w") as f:
+            f.write("&controls\n    initial_mass = {}\n/\n".format(mass))
+        scheduler.add("inlist_main", work_dir, name=str(mass))
+
+    dependencies = scheduler.dependencies()
+    durations = scheduler.predict_durations()
+    assert durations["4.0"] == pytest.approx(400)
+    ranks = scheduler.ranks(dependencies)
+    assert scheduler.ready(dependencies, set(), ranks) == \
+        ["4.0", "2.0", "1.0"]
+    assert scheduler.eta(dependencies) == pytest.approx(400)
+    assert all(status == "pending" for status in scheduler.status.values())
+
+    runtime_model.add({"initial_mass": 1.0}, 300)
+    durations = scheduler.predict_durations(["1.0"])
+    assert durations["1.0"] > 100
+    assert durations["4.0"] == pytest.approx(400)
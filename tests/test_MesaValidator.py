@@ -0,0 +1,61 @@
+from MesaHandler import MesaValidator
+from tests.helpers import copyInlists
+
+
+def testValidate(tmp_path):
+    copyInlists(str(tmp_path))
+    validator = MesaValidator()
+    assert validator.validate(str(tmp_path)) == []
+
+    with open(str(tmp_path / "inlist_project")) as f:
+        content = f.read()
+    content = content.replace("    initial_mass = 10", "\n".join([
+        "    initial_mass = .true.",
+        "    initial_mas = 10",
+        "    x_ctrl(101) = 1d0",
+        "    x_ctrl(1:3) = 1d0",
+        "    create_pre_main_sequence_model = .false.",
+        "    max_model_number = 1.5",
+        "    x_integer_ctrl(2) = 2.5",
+        "    x_integer_ctrl(3:4) = 4, 5",
+        "    x_ctrl(4:5) = .true., .false.",
+        "    x_ctrl(6:7) = 'a', 'b'",
+        "    mixing_length_alpha = 1.8",
+        "    read_extra_controls_inlist2 = .true.",
+        "    extra_controls_inlist2_name = 'inlist_extra'",
+    ]))
+    content = content.replace("    pgstar_flag = .false.", "\n".join([
+        "    pgstar_flag = .false.",
+        "    load_saved_model = .true.",
+        "    saved_model_name = 'missing.mod'",
+    ]))
+    with open(str(tmp_path / "inlist_project"), "w") as f:
+        f.write(content)
+    (tmp_path / "inlist_pgstar").unlink()
+
+    issues = validator.validate(str(tmp_path))
+    assert len(issues) == 11
+    assert "inlist_project: &controls inlist inlist_extra does not " \
+        "exist" in issues
+    assert "inlist_project: &controls: max_model_number has type float, " \
+        "expected int" in issues
+    assert "inlist_project: &controls: x_integer_ctrl(2) has type float, " \
+        "expected int" in issues
+    assert "inlist_project: &controls: x_ctrl(4:5) has type bool, " \
+        "expected float" in issues
+    assert "inlist_project: &controls: x_ctrl(6:7) has type str, " \
+        "expected float" in issues
+    assert "inlist: &pgstar inlist inlist_pgstar does not exist" in issues
+    assert "inlist_project: &controls: initial_mass has type bool, " \
+        "expected float" in issues
+    assert "inlist_project: &controls: initial_mas is not a MESA " \
+        "parameter" in issues
+    assert "inlist_project: &controls: x_ctrl(101) is out of the " \
+        "bounds (1:100)" in issues
+    assert "inlist_project: &controls: create_pre_main_sequence_model " \
+        "belongs to the &star_job section" in issues
+    assert "saved_model_name missing.mod does not exist" in issues
+
+    results = validator.validate_many([str(tmp_path), str(tmp_path)],
+                                      processes=2)
+    assert list(results.values()) == [issues]
@@ -0,0 +1,78 @@
+import os
+
+import pytest
+
+from MesaHandler import MesaWorkDir, MesaLogReader
+
+
+@pytest.fixture(scope="function")
+def workDir(tmp_path):
+    src = tmp_path / "work"
+    (src / "make").mkdir(parents=True)
+    (src / "LOGS").mkdir()
+    (src / "star").write_text("binary")
+    (src / "make" / "run.o").write_text("object")
+    (src / "zams.mod").write_text("model")
+    (src / "inlist").write_text("&star_job\n/\n")
+    (src / "LOGS" / "history.data").write_text("history")
+    (src / "LOGS" / "profiles.index").write_text("index")
+    return MesaWorkDir(str(src))
+
+
+def testClone(workDir: MesaWorkDir, tmp_path):
+    clone = workDir.clone(str(tmp_path / "clone"))
+    assert os.path.samefile(os.path.join(workDir.path, "star"),
+                            os.path.join(clone.path, "star"))
+    assert os.path.samefile(os.path.join(workDir.path, "make", "run.o"),
+                            os.path.join(clone.path, "make", "run.o"))
+    assert os.path.samefile(os.path.join(workDir.path, "zams.mod"),
+                            os.path.join(clone.path, "zams.mod"))
+    assert not os.path.samefile(os.path.join(workDir.path, "inlist"),
+                                os.path.join(clone.path, "inlist"))
+    assert not os.path.exists(os.path.join(clone.path, "LOGS"))
+
+
+@pytest.mark.parametrize("mode", ["copy", "link", "move"])
+def testArchiveLogs(workDir: MesaWorkDir, tmp_path, mode: str):
+    dst = str(tmp_path / "archive")
+    archived = workDir.archive_logs(dst, mode=mode)
+    assert sorted(os.path.basename(f) for f in archived) == \
+        ["history.data", "profiles.index"]
+    with open(os.path.join(dst, "history.data")) as f:
+        assert f.read() == "history"
+    src_file = os.path.join(workDir.path, "LOGS", "history.data")
+    assert os.path.exists(src_file) == (mode != "move")
+
+    with pytest.raises(ValueError):
+        workDir.archive_logs(dst, mode="dummy")
+
+
+def testArchiveCompressed(workDir: MesaWorkDir, tmp_path):
+    history = "\n".join([
+        "  1  2",
+        "  version_number  burn_min1",
+        '  "r15140"  5.0D+01',
+        "",
+        "  1  2",
+        "  model_number  star_age",
+        "  1  1.0E-05",
+        "  2  2.5-100",
+        ""])
+    with open(os.path.join(workDir.path, "LOGS", "history.data"), "w") as f:
+        f.write(history)
+
+    dst = str(tmp_path / "archive")
+    archived = workDir.archive_logs(dst, mode="move", compress="gzip")
+    assert os.path.join(dst, "history.data.gz") in archived
+    assert os.path.exists(os.path.join(dst, "profiles.index"))
+    assert not os.path.exists(os.path.join(dst, "history.data"))
+    assert not os.path.exists(
+        os.path.join(workDir.path, "LOGS", "history.data"))
+
+    reader = MesaLogReader(os.path.join(dst, "history.data"))
+    assert reader.compressed
+    assert reader.header["version_number"] == "r15140"
+    assert reader.header["burn_min1"] == 50.0
+    assert reader.column_names == ["model_number", "star_age"]
+    assert reader.last_row()["star_age"] == 2.5e-100
+    assert list(reader.data(["model_number"])["model_number"]) == [1, 2]